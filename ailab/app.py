@@ -1,8 +1,11 @@
+from uuid import uuid4
+
 import streamlit as st
 
 from support_app import db
-from support_app.graph import run_support_flow
-from support_app.ui_utils import stream_text
+from support_app.config import settings
+from support_app.persistence import get_persister
+from support_app.warmup import start_background_warmup
 
 
 st.set_page_config(page_title="Multi-Agent Ticket Resolution", layout="wide")
@@ -25,6 +28,10 @@ if "auth_user" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state["messages"] = []
 
+# Keys the graph checkpoint: follow-ups in one conversation resume a pending clarification.
+if "conversation_id" not in st.session_state:
+    st.session_state["conversation_id"] = uuid4().hex
+
 
 def render_login():
     st.title("Login")
@@ -37,6 +44,7 @@ def render_login():
             return
         st.session_state["auth_user"] = user
         st.session_state["messages"] = []
+        st.session_state["conversation_id"] = uuid4().hex
         st.rerun()
 
 
@@ -50,6 +58,11 @@ def render_sidebar(user_id: str):
     st.sidebar.divider()
     st.sidebar.header("Ticket History")
     tickets = db.list_user_tickets(user_id, limit=25)
+    if settings.ticket_write_behind:
+        # Show tickets still queued for write-behind ahead of what Supabase returned.
+        pending = get_persister().pending_for_user(user_id)
+        pending_ids = {t.ticket_id for t in pending}
+        tickets = pending + [t for t in tickets if t.ticket_id not in pending_ids]
     open_tickets = [t for t in tickets if (t.status or "") != "Closed"]
 
     st.sidebar.subheader("Open / In Progress")
@@ -65,6 +78,10 @@ def render_sidebar(user_id: str):
         st.sidebar.caption(f"{_status_badge(t.status)} | {t.ticket_id}")
 
     st.sidebar.divider()
+    if st.sidebar.button("New conversation"):
+        st.session_state["messages"] = []
+        st.session_state["conversation_id"] = uuid4().hex
+        st.rerun()
     if st.sidebar.button("Sign out"):
         st.session_state["auth_user"] = None
         st.session_state["messages"] = []
@@ -76,6 +93,8 @@ if user is None:
     render_login()
     st.stop()
 
+# Compile the graph and load the ticket index while the user reads the sidebar.
+start_background_warmup()
 render_sidebar(user.user_id)
 
 st.title("Support Chat")
@@ -86,14 +105,19 @@ for msg in st.session_state["messages"]:
 
 user_input = st.chat_input("Describe your login issue...")
 if user_input:
+    from support_app.graph import stream_support_flow
+
     st.session_state["messages"].append({"role": "user", "content": user_input})
     with st.chat_message("user"):
         st.markdown(user_input)
 
     with st.chat_message("assistant"):
-        with st.spinner("Working on your ticket..."):
-            result = run_support_flow(user_id=user.user_id, user_message=user_input)
-            assistant_text = result.get("assistant_message", "")
-        st.write_stream(stream_text(assistant_text))
+        flow = stream_support_flow(
+            user_id=user.user_id,
+            user_message=user_input,
+            conversation_id=st.session_state["conversation_id"],
+        )
+        streamed = st.write_stream(flow)
+        assistant_text = flow.result.get("assistant_message") or streamed
 
     st.session_state["messages"].append({"role": "assistant", "content": assistant_text})
@@ -0,0 +1 @@
+# Lets `pytest` import `support_app` from this directory.
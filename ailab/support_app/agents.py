@@ -1,13 +1,108 @@
 from __future__ import annotations
 
+import re
 from datetime import datetime
+from typing import Callable, TypeVar
 
+import numpy as np
 from pydantic import BaseModel, Field
 
-from .llm import get_chat_llm
+from .config import settings
+from .llm import chat_singleflight, get_chat_llm, get_embeddings
+from .semantic_cache import SemanticCache
 from .types import Severity, TicketDraft
 
 
+TextCallback = Callable[[str], None]
+_Output = TypeVar("_Output", bound=BaseModel)
+
+
+def _stream_structured(
+    schema: type[_Output],
+    prompt: str,
+    text_of: Callable[[_Output], str | None],
+    on_text: TextCallback,
+) -> _Output:
+    """Run a structured call, passing each new piece of `text_of(output)` to `on_text` as it arrives.
+
+    Uses tool calling because its parser yields partial objects while streaming;
+    the json_schema parser only emits once the whole response is in.
+    """
+    structured_llm = get_chat_llm().with_structured_output(schema, method="function_calling")
+    result: _Output | None = None
+    emitted = ""
+    for partial in structured_llm.stream(prompt):
+        result = partial
+        text = text_of(result) or ""
+        if len(text) > len(emitted) and text.startswith(emitted):
+            on_text(text[len(emitted) :])
+            emitted = text
+    if result is None:
+        raise RuntimeError(f"No {schema.__name__} returned by the model")
+    return result
+
+
+async def _astream_structured(
+    schema: type[_Output],
+    prompt: str,
+    text_of: Callable[[_Output], str | None],
+    on_text: TextCallback,
+) -> _Output:
+    structured_llm = get_chat_llm().with_structured_output(schema, method="function_calling")
+    result: _Output | None = None
+    emitted = ""
+    async for partial in structured_llm.astream(prompt):
+        result = partial
+        text = text_of(result) or ""
+        if len(text) > len(emitted) and text.startswith(emitted):
+            on_text(text[len(emitted) :])
+            emitted = text
+    if result is None:
+        raise RuntimeError(f"No {schema.__name__} returned by the model")
+    return result
+
+
+def _structured_call(
+    schema: type[_Output],
+    prompt: str,
+    text_of: Callable[[_Output], str | None],
+    on_text: TextCallback | None,
+) -> _Output:
+    """Structured LLM call shared by concurrent callers with the same prompt.
+
+    Only the caller that actually runs the call streams; the others get the
+    finished text in one piece.
+    """
+    key = (settings.openai_model, schema.__name__, prompt)
+    if on_text is not None:
+        result, shared = chat_singleflight.do(key, lambda: _stream_structured(schema, prompt, text_of, on_text))
+        if shared and text_of(result):
+            on_text(text_of(result))
+        return result
+    structured_llm = get_chat_llm().with_structured_output(schema)
+    result, _ = chat_singleflight.do(key, lambda: structured_llm.invoke(prompt))
+    return result
+
+
+async def _astructured_call(
+    schema: type[_Output],
+    prompt: str,
+    text_of: Callable[[_Output], str | None],
+    on_text: TextCallback | None,
+) -> _Output:
+    key = (settings.openai_model, schema.__name__, prompt)
+    if on_text is not None:
+        result, shared = await chat_singleflight.ado(
+            key, lambda: _astream_structured(schema, prompt, text_of, on_text)
+        )
+        if shared and text_of(result):
+            on_text(text_of(result))
+        return result
+    structured_llm = get_chat_llm().with_structured_output(schema)
+    result, _ = await chat_singleflight.ado(key, lambda: structured_llm.ainvoke(prompt))
+    return result
+
+
 class ConversationOutput(BaseModel):
     needs_ticket: bool = Field(
         description="True when the user is reporting a login/authentication problem that should become a ticket."
@@ -25,11 +120,12 @@ class TicketDraftModel(BaseModel):
     severity: Severity
 
 
-def run_conversation_agent(user_message: str) -> ConversationOutput:
-    llm = get_chat_llm()
+def _reply_text(out: ConversationOutput) -> str:
+    return out.message
+
 
-    structured_llm = llm.with_structured_output(ConversationOutput)
-    prompt = (
+def _conversation_prompt(user_message: str) -> str:
+    return (
         "You are a helpful IT support assistant specializing in login/auth issues. "
         "Classify whether the user's message is a login/authentication issue. "
         "If it is, set needs_ticket=true and create a concise ticket draft with: "
@@ -41,7 +137,65 @@ def run_conversation_agent(user_message: str) -> ConversationOutput:
         f"User message: {user_message}"
     )
 
-    return structured_llm.invoke(prompt)
+
+_conversation_cache: SemanticCache | None = None
+
+
+def get_conversation_cache() -> SemanticCache | None:
+    global _conversation_cache
+    if not settings.conversation_cache:
+        return None
+    if _conversation_cache is None:
+        _conversation_cache = SemanticCache(
+            max_entries=settings.conversation_cache_max_entries,
+            ttl_s=settings.conversation_cache_ttl_s,
+            max_distance=settings.conversation_cache_distance,
+        )
+    return _conversation_cache
+
+
+def _from_cache(cached: ConversationOutput, user_message: str, on_text: TextCallback | None) -> ConversationOutput:
+    # Reuse the decision, reply and ticket title/severity; the issue is the user's own words.
+    out = cached
+    if cached.ticket is not None:
+        out = cached.model_copy(update={"ticket": {**cached.ticket, "issue_description": user_message}})
+    if on_text is not None:
+        on_text(out.message)
+    return out
+
+
+def run_conversation_agent(user_message: str, on_text: TextCallback | None = None) -> ConversationOutput:
+    cache = get_conversation_cache()
+    vector = None
+    if cache is not None and user_message.strip():
+        vector = np.asarray(get_embeddings().embed_query(user_message), dtype=np.float32)
+        cached = cache.get(vector)
+        if cached is not None:
+            return _from_cache(cached, user_message, on_text)
+
+    out = _structured_call(ConversationOutput, _conversation_prompt(user_message), _reply_text, on_text)
+    if vector is not None:
+        cache.put(vector, out)
+    return out
+
+
+async def arun_conversation_agent(
+    user_message: str, on_text: TextCallback | None = None
+) -> ConversationOutput:
+    cache = get_conversation_cache()
+    vector = None
+    if cache is not None and user_message.strip():
+        vector = np.asarray(await get_embeddings().aembed_query(user_message), dtype=np.float32)
+        cached = cache.get(vector)
+        if cached is not None:
+            return _from_cache(cached, user_message, on_text)
+
+    out = await _astructured_call(
+        ConversationOutput, _conversation_prompt(user_message), _reply_text, on_text
+    )
+    if vector is not None:
+        cache.put(vector, out)
+    return out
 
 
 class ClarificationOutput(BaseModel):
@@ -50,17 +204,35 @@ class ClarificationOutput(BaseModel):
     solution: str | None = None
 
 
-def run_clarification_and_solution(issue_description: str) -> ClarificationOutput:
-    llm = get_chat_llm()
-    structured_llm = llm.with_structured_output(ClarificationOutput)
-    prompt = (
+def _solution_text(out: ClarificationOutput) -> str | None:
+    return None if out.needs_more_info else out.solution
+
+
+def _clarification_prompt(issue_description: str) -> str:
+    return (
         "You are a ticket resolution agent for login issues. "
         "If the issue description is too vague, ask 2-4 specific clarifying questions and set needs_more_info=true. "
         "If enough info is present, set needs_more_info=false and produce a detailed step-by-step solution. "
         "Solutions must be structured and reusable (use numbered steps, include common causes, and escalation notes).\n\n"
         f"Issue description: {issue_description}"
     )
-    return structured_llm.invoke(prompt)
+
+
+def run_clarification_and_solution(
+    issue_description: str, on_text: TextCallback | None = None
+) -> ClarificationOutput:
+    """`on_text` receives the solution text as it streams (nothing when asking for more info)."""
+    return _structured_call(
+        ClarificationOutput, _clarification_prompt(issue_description), _solution_text, on_text
+    )
+
+
+async def arun_clarification_and_solution(
+    issue_description: str, on_text: TextCallback | None = None
+) -> ClarificationOutput:
+    return await _astructured_call(
+        ClarificationOutput, _clarification_prompt(issue_description), _solution_text, on_text
+    )
 
 
 def format_reused_solution(solution: str, source: str) -> str:
@@ -68,3 +240,19 @@ def format_reused_solution(solution: str, source: str) -> str:
     return (
         f"I found a similar resolved ticket ({source}). Here is the proven fix as of {timestamp}:\n\n{solution}"
     )
+
+
+_REUSED_PREFIX = re.compile(
+    r"^I found a similar resolved ticket \(.*?\)\. Here is the proven fix as of .*? UTC:\s*",
+    re.DOTALL,
+)
+
+
+def unwrap_reused_solution(solution: str) -> str:
+    """Strip (possibly nested) `format_reused_solution` wrappers back to the original fix."""
+    text = solution or ""
+    while True:
+        unwrapped = _REUSED_PREFIX.sub("", text, count=1)
+        if unwrapped == text:
+            return text
+        text = unwrapped
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Literal
+
+import numpy as np
+
+from .config import settings
+
+
+IndexType = Literal["flat", "hnsw", "ivf"]
+
+
+def choose_index_type(n: int) -> IndexType:
+    configured = settings.similarity_index_type
+    if configured in ("flat", "hnsw", "ivf"):
+        return configured
+    if n < settings.similarity_ann_min_size:
+        return "flat"
+    if n < settings.similarity_ivf_min_size:
+        return "hnsw"
+    return "ivf"
+
+
+class AnnIndex:
+    """FAISS HNSW/IVF index over the same row positions as `SimilarityIndex`.
+
+    With `SIMILARITY_PQ_M` set, the index keeps product-quantized codes instead of
+    its own full-precision copy of the vectors.
+    """
+
+    def __init__(self, index_type: IndexType, dim: int) -> None:
+        import faiss
+
+        self.index_type = index_type
+        self.dim = dim
+        self._faiss = faiss
+        self._index: Any = None
+
+    @classmethod
+    def build(cls, index_type: IndexType, vectors: np.ndarray) -> "AnnIndex":
+        ann = cls(index_type, vectors.shape[1])
+        faiss = ann._faiss
+        pq_m = settings.similarity_pq_m
+        if pq_m and ann.dim % pq_m:
+            raise ValueError(f"SIMILARITY_PQ_M={pq_m} must divide the embedding dimension {ann.dim}")
+
+        train = np.ascontiguousarray(vectors, dtype=np.float32)
+        if index_type == "hnsw":
+            if pq_m:
+                index = faiss.IndexHNSWPQ(ann.dim, pq_m, settings.similarity_hnsw_m)
+            else:
+                index = faiss.IndexHNSWFlat(ann.dim, settings.similarity_hnsw_m)
+            index.hnsw.efConstruction = settings.similarity_hnsw_ef_construction
+        else:
+            nlist = settings.similarity_ivf_nlist or max(1, int(4 * math.sqrt(len(vectors))))
+            quantizer = faiss.IndexFlatL2(ann.dim)
+            if pq_m:
+                index = faiss.IndexIVFPQ(quantizer, ann.dim, nlist, pq_m, 8)
+            else:
+                index = faiss.IndexIVFFlat(quantizer, ann.dim, nlist)
+        if not index.is_trained:
+            index.train(train)
+        ann._index = index
+        ann.add(vectors)
+        return ann
+
+    @property
+    def ntotal(self) -> int:
+        return int(self._index.ntotal)
+
+    def nbytes(self) -> int:
+        if settings.similarity_pq_m:
+            per_vector = settings.similarity_pq_m
+        else:
+            per_vector = self.dim * 4
+        if self.index_type == "hnsw":
+            per_vector += settings.similarity_hnsw_m * 2 * 4
+        else:
+            per_vector += 8
+        return self.ntotal * per_vector
+
+    def add(self, vectors: np.ndarray) -> None:
+        if len(vectors):
+            self._index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int,
+        radius: float | None = None,
+        include: np.ndarray | None = None,
+        exclude: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (positions, squared L2 distances) sorted by distance.
+
+        With `radius`, runs a FAISS range search so only rows within the
+        threshold are visited and returned, capped at `k`.
+        """
+        faiss = self._faiss
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        selector = None
+        if include is not None:
+            selector = faiss.IDSelectorBatch(np.ascontiguousarray(include, dtype=np.int64))
+        elif exclude is not None and len(exclude):
+            inner = faiss.IDSelectorBatch(np.ascontiguousarray(exclude, dtype=np.int64))
+            selector = faiss.IDSelectorNot(inner)
+
+        if self.index_type == "hnsw":
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(k, settings.similarity_hnsw_ef_search))
+        else:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=settings.similarity_ivf_nprobe)
+
+        if radius is None:
+            distances, positions = self._index.search(query, k, params=params)
+            keep = positions[0] >= 0
+            return positions[0][keep], distances[0][keep]
+
+        # FAISS range search is strict (< radius); nudge it so `score <= threshold` still matches.
+        radius = float(np.nextafter(np.float32(radius), np.float32(np.inf)))
+        _, distances, positions = self._index.range_search(query, radius, params=params)
+        order = np.argsort(distances)[:k]
+        return positions[order], distances[order]
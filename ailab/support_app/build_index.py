@@ -0,0 +1,39 @@
+"""Build or refresh the closed-ticket vector snapshot offline.
+
+    python -m support_app.build_index            # refresh from the last snapshot's watermark
+    python -m support_app.build_index --full     # re-index every closed ticket
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from .config import settings
+from .similarity import SharedTicketIndex
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or refresh the ticket vector snapshot.")
+    parser.add_argument(
+        "--dir",
+        default=settings.similarity_snapshot_dir,
+        help="Snapshot directory (default: SIMILARITY_SNAPSHOT_DIR)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the existing snapshot and rebuild from all closed tickets",
+    )
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("no snapshot directory; pass --dir or set SIMILARITY_SNAPSHOT_DIR")
+
+    index = SharedTicketIndex(snapshot_dir=None if args.full else args.dir)
+    added = index.sync()
+    path = index.save_snapshot(args.dir)
+    print(f"Indexed {len(index)} closed tickets ({added} new), watermark {index.watermark} -> {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,6 +16,7 @@ class Settings:
         self.openai_embeddings_model = os.getenv(
             "OPENAI_EMBEDDINGS_MODEL", "text-embedding-3-large"
         )
+        self.openai_embeddings_dimensions = int(os.getenv("OPENAI_EMBEDDINGS_DIMENSIONS", "0"))
         self.openai_verify_ssl = os.getenv("OPENAI_VERIFY_SSL", "false").lower() in (
             "1",
             "true",
@@ -32,7 +33,109 @@ class Settings:
             "y",
         )
 
+        self.supabase_http2 = os.getenv("SUPABASE_HTTP2", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.supabase_max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+        self.supabase_max_keepalive = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+        self.supabase_keepalive_expiry = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+        self.supabase_timeout = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+
         self.similarity_threshold = float(os.getenv("SIMILARITY_THRESHOLD", "0.82"))
+        self.similarity_dedup = os.getenv("SIMILARITY_DEDUP", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.similarity_dedup_distance = float(os.getenv("SIMILARITY_DEDUP_DISTANCE", "0.05"))
+        self.similarity_vector_dtype = os.getenv("SIMILARITY_VECTOR_DTYPE", "float32").lower()
+        self.similarity_pq_m = int(os.getenv("SIMILARITY_PQ_M", "0"))
+        self.similarity_index_type = os.getenv("SIMILARITY_INDEX_TYPE", "auto").lower()
+        self.similarity_ann_min_size = int(os.getenv("SIMILARITY_ANN_MIN_SIZE", "20000"))
+        self.similarity_ivf_min_size = int(os.getenv("SIMILARITY_IVF_MIN_SIZE", "500000"))
+        self.similarity_hnsw_m = int(os.getenv("SIMILARITY_HNSW_M", "32"))
+        self.similarity_hnsw_ef_construction = int(
+            os.getenv("SIMILARITY_HNSW_EF_CONSTRUCTION", "80")
+        )
+        self.similarity_hnsw_ef_search = int(os.getenv("SIMILARITY_HNSW_EF_SEARCH", "64"))
+        self.similarity_ivf_nlist = int(os.getenv("SIMILARITY_IVF_NLIST", "0"))
+        self.similarity_ivf_nprobe = int(os.getenv("SIMILARITY_IVF_NPROBE", "16"))
+        self.similarity_index_max_mb = float(os.getenv("SIMILARITY_INDEX_MAX_MB", "0"))
+        self.similarity_pinned_users = int(os.getenv("SIMILARITY_PINNED_USERS", "0"))
+        self.similarity_hybrid = os.getenv("SIMILARITY_HYBRID", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.similarity_lexical_weight = float(os.getenv("SIMILARITY_LEXICAL_WEIGHT", "0.3"))
+        self.speculative_solution = os.getenv("SPECULATIVE_SOLUTION", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.similarity_sync_overlap_s = float(os.getenv("SIMILARITY_SYNC_OVERLAP_S", "300"))
+        self.similarity_snapshot_dir = os.getenv(
+            "SIMILARITY_SNAPSHOT_DIR", os.path.join(".cache", "ticket_index")
+        )
+
+        self.embedding_cache_path = os.getenv(
+            "EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3")
+        )
+        self.embedding_cache_max_mb = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+        self.embedding_batch_tokens = int(os.getenv("EMBEDDING_BATCH_TOKENS", "50000"))
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))
+        self.embedding_workers = int(os.getenv("EMBEDDING_WORKERS", "4"))
+        self.embedding_max_retries = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+
+        self.triage_fast_path = os.getenv("TRIAGE_FAST_PATH", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.triage_min_confidence = float(os.getenv("TRIAGE_MIN_CONFIDENCE", "0.9"))
+
+        self.conversation_cache = os.getenv("CONVERSATION_CACHE", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.conversation_cache_distance = float(os.getenv("CONVERSATION_CACHE_DISTANCE", "0.08"))
+        self.conversation_cache_ttl_s = float(os.getenv("CONVERSATION_CACHE_TTL_S", "3600"))
+        self.conversation_cache_max_entries = int(
+            os.getenv("CONVERSATION_CACHE_MAX_ENTRIES", "2000")
+        )
+
+        self.checkpoint_path = os.getenv(
+            "SUPPORT_CHECKPOINT_PATH", os.path.join(".cache", "checkpoints.sqlite3")
+        )
+
+        self.duplicate_ticket_check = os.getenv("DUPLICATE_TICKET_CHECK", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.duplicate_ticket_window_min = float(os.getenv("DUPLICATE_TICKET_WINDOW_MIN", "60"))
+        self.duplicate_ticket_distance = float(os.getenv("DUPLICATE_TICKET_DISTANCE", "0.15"))
+
+        self.ticket_write_behind = os.getenv("TICKET_WRITE_BEHIND", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+            "y",
+        )
+        self.write_behind_spool_path = os.getenv(
+            "WRITE_BEHIND_SPOOL_PATH", os.path.join(".cache", "ticket_spool.jsonl")
+        )
+        self.write_behind_max_attempts = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "20"))
 
     def validate(self) -> None:
         missing: list[str] = []
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import threading
+import weakref
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Iterator, Literal
 from uuid import UUID, uuid4
 
 import httpx
-from supabase import Client, create_client
-from supabase.lib.client_options import SyncClientOptions
 
 from .config import settings
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient, Client
+
 
 TicketStatus = Literal["Open", "In Progress", "Closed"]
 
@@ -37,12 +42,86 @@ class TicketRow:
     resolved_at: str | None
 
 
+_client: Client | None = None
+_http_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _http_client_options() -> dict[str, Any]:
+    return {
+        "verify": settings.supabase_verify_ssl,
+        "http2": settings.supabase_http2 and _http2_available(),
+        "timeout": settings.supabase_timeout,
+        "limits": httpx.Limits(
+            max_connections=settings.supabase_max_connections,
+            max_keepalive_connections=settings.supabase_max_keepalive,
+            keepalive_expiry=settings.supabase_keepalive_expiry,
+        ),
+    }
+
+
 def get_supabase() -> Client:
-    settings.validate()
-    options = SyncClientOptions(
-        httpx_client=httpx.Client(verify=settings.supabase_verify_ssl)
-    )
-    return create_client(settings.supabase_url, settings.supabase_key, options=options)
+    """Process-wide Supabase client; every query reuses its pooled keep-alive connections."""
+    global _client, _http_client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            from supabase import create_client
+            from supabase.lib.client_options import SyncClientOptions
+
+            settings.validate()
+            _http_client = httpx.Client(**_http_client_options())
+            options = SyncClientOptions(httpx_client=_http_client)
+            _client = create_client(settings.supabase_url, settings.supabase_key, options=options)
+    return _client
+
+
+def close_supabase() -> None:
+    global _client, _http_client
+    with _client_lock:
+        http_client, _client, _http_client = _http_client, None, None
+    if http_client is not None:
+        http_client.close()
+
+
+atexit.register(close_supabase)
+
+
+# Async connections belong to the event loop that opened them, so keep one client per loop.
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+_async_client_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def aget_supabase() -> AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+    # Concurrent first calls on a loop would otherwise each build (and leak) a client.
+    async with _async_client_locks.setdefault(loop, asyncio.Lock()):
+        client = _async_clients.get(loop)
+        if client is None:
+            from supabase import acreate_client
+            from supabase.lib.client_options import AsyncClientOptions
+
+            settings.validate()
+            options = AsyncClientOptions(httpx_client=httpx.AsyncClient(**_http_client_options()))
+            client = await acreate_client(settings.supabase_url, settings.supabase_key, options=options)
+            _async_clients[loop] = client
+    return client
 
 
 def authenticate_user(username: str, password: str) -> UserRow | None:
@@ -91,36 +170,67 @@ def list_user_tickets(user_id: str, limit: int = 50) -> list[TicketRow]:
     return [TicketRow(**row) for row in (res.data or [])]
 
 
-def list_closed_tickets_for_user(user_id: str, limit: int = 200) -> list[TicketRow]:
+def iter_closed_ticket_pages(
+    after: tuple[str, str] | None = None,
+    page_size: int = 500,
+    since: str | None = None,
+) -> Iterator[list[TicketRow]]:
+    """Stream every closed ticket in (resolved_at, ticket_id) order, one page at a time.
+
+    Keyset pagination: each page starts strictly after the last row of the previous one,
+    so `after` doubles as a "changes since watermark" cursor. `since` instead starts at
+    the first ticket resolved at or after that timestamp.
+    """
     sb = get_supabase()
-    res = (
-        sb.table("tickets")
-        .select(
-            "ticket_id, user_id, ticket_title, issue_description, severity, status, solution, created_at, resolved_at"
+    cursor = after
+    while True:
+        query = (
+            sb.table("tickets")
+            .select(
+                "ticket_id, user_id, ticket_title, issue_description, severity, status, solution, created_at, resolved_at"
+            )
+            .eq("status", "Closed")
+            .not_.is_("resolved_at", "null")
         )
-        .eq("user_id", user_id)
-        .eq("status", "Closed")
-        .order("resolved_at", desc=True)
-        .limit(limit)
-        .execute()
-    )
-    return [TicketRow(**row) for row in (res.data or [])]
+        if cursor is None and since is not None:
+            query = query.gte("resolved_at", since)
+        elif cursor is not None:
+            resolved_at, ticket_id = cursor
+            query = query.or_(
+                f'resolved_at.gt."{resolved_at}",'
+                f'and(resolved_at.eq."{resolved_at}",ticket_id.gt."{ticket_id}")'
+            )
+        res = query.order("resolved_at").order("ticket_id").limit(page_size).execute()
+        page = [TicketRow(**row) for row in (res.data or [])]
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = (page[-1].resolved_at or "", page[-1].ticket_id)
 
 
-def list_closed_tickets_other_users(user_id: str, limit: int = 400) -> list[TicketRow]:
-    sb = get_supabase()
-    res = (
-        sb.table("tickets")
-        .select(
-            "ticket_id, user_id, ticket_title, issue_description, severity, status, solution, created_at, resolved_at"
-        )
-        .neq("user_id", user_id)
-        .eq("status", "Closed")
-        .order("resolved_at", desc=True)
-        .limit(limit)
-        .execute()
-    )
-    return [TicketRow(**row) for row in (res.data or [])]
+def row_to_ticket(row: dict[str, Any]) -> TicketRow:
+    # Write responses carry every column of the stored row; keep the ones TicketRow models.
+    return TicketRow(**{name: row.get(name) for name in TicketRow.__dataclass_fields__})
+
+
+def new_ticket_payload(
+    user_id: str,
+    ticket_title: str,
+    issue_description: str,
+    severity: str,
+    status: TicketStatus = "Open",
+    ticket_id: str | None = None,
+) -> dict[str, Any]:
+    return {
+        "ticket_id": ticket_id or str(uuid4()),
+        "user_id": user_id,
+        "ticket_title": ticket_title,
+        "issue_description": issue_description,
+        "severity": severity,
+        "status": status,
+    }
 
 
 def insert_ticket(
@@ -131,30 +241,38 @@ def insert_ticket(
     status: TicketStatus = "Open",
 ) -> TicketRow:
     sb = get_supabase()
-    ticket_id = str(uuid4())
-    sb.table("tickets").insert(
-        {
-            "ticket_id": ticket_id,
-            "user_id": user_id,
-            "ticket_title": ticket_title,
-            "issue_description": issue_description,
-            "severity": severity,
-            "status": status,
-        }
-    ).execute()
+    payload = new_ticket_payload(user_id, ticket_title, issue_description, severity, status)
+    # PostgREST returns the stored row (return=representation), so no read-back select.
+    res = sb.table("tickets").insert(payload).execute()
+    if not res.data:
+        raise RuntimeError("Failed to insert ticket")
+    return row_to_ticket(res.data[0])
 
-    res = (
-        sb.table("tickets")
-        .select(
-            "ticket_id, user_id, ticket_title, issue_description, severity, status, solution, created_at, resolved_at"
-        )
-        .eq("ticket_id", ticket_id)
-        .limit(1)
-        .execute()
-    )
+
+def upsert_ticket(payload: dict[str, Any]) -> TicketRow:
+    """Idempotent insert keyed on ticket_id, so a replayed write cannot duplicate a ticket."""
+    sb = get_supabase()
+    res = sb.table("tickets").upsert(payload, on_conflict="ticket_id").execute()
     if not res.data:
-        raise RuntimeError("Failed to fetch inserted ticket")
-    return TicketRow(**res.data[0])
+        raise RuntimeError("Failed to upsert ticket")
+    return row_to_ticket(res.data[0])
+
+
+def insert_tickets(tickets: list[dict[str, Any]], batch_size: int = 500) -> list[TicketRow]:
+    """Insert many tickets, one request per `batch_size` rows.
+
+    Each item takes the keyword arguments of `insert_ticket`.
+    """
+    sb = get_supabase()
+    payloads = [new_ticket_payload(**ticket) for ticket in tickets]
+    rows: list[TicketRow] = []
+    for i in range(0, len(payloads), batch_size):
+        batch = payloads[i : i + batch_size]
+        res = sb.table("tickets").insert(batch).execute()
+        if len(res.data or []) != len(batch):
+            raise RuntimeError(f"Failed to insert tickets {i}-{i + len(batch) - 1}")
+        rows.extend(row_to_ticket(row) for row in res.data)
+    return rows
 
 
 def update_ticket_solution(
@@ -162,6 +280,7 @@ def update_ticket_solution(
     solution: str,
     status: TicketStatus = "Closed",
     resolved_at: datetime | None = None,
+    issue_description: str | None = None,
 ) -> TicketRow:
     sb = get_supabase()
     payload: dict[str, Any] = {
@@ -169,17 +288,131 @@ def update_ticket_solution(
         "status": status,
         "resolved_at": (resolved_at or datetime.utcnow()).isoformat(),
     }
-    sb.table("tickets").update(payload).eq("ticket_id", ticket_id).execute()
+    if issue_description is not None:
+        payload["issue_description"] = issue_description
+    res = sb.table("tickets").update(payload).eq("ticket_id", ticket_id).execute()
+    if not res.data:
+        raise RuntimeError("Failed to update ticket")
+    return row_to_ticket(res.data[0])
 
-    res = (
+
+def close_tickets(
+    solutions: dict[str, str],
+    resolved_at: datetime | None = None,
+    batch_size: int = 200,
+) -> list[TicketRow]:
+    """Close many tickets (ticket_id -> solution) in two requests per `batch_size` tickets.
+
+    PostgREST can't set a different value per row in one update, so each batch reads
+    the current rows and upserts them back closed, however many distinct solutions
+    there are. Raises when a ticket_id doesn't exist, like `insert_tickets` on a short insert.
+    """
+    sb = get_supabase()
+    stamp = (resolved_at or datetime.utcnow()).isoformat()
+    ticket_ids = list(solutions)
+    rows: list[TicketRow] = []
+    for i in range(0, len(ticket_ids), batch_size):
+        batch = ticket_ids[i : i + batch_size]
+        res = (
+            sb.table("tickets")
+            .select(
+                "ticket_id, user_id, ticket_title, issue_description, severity, status, solution, created_at, resolved_at"
+            )
+            .in_("ticket_id", batch)
+            .execute()
+        )
+        current = res.data or []
+        if len(current) != len(batch):
+            missing = sorted(set(batch) - {str(row["ticket_id"]) for row in current})
+            raise RuntimeError(f"Failed to close tickets; not found: {', '.join(missing)}")
+        payload = [
+            {**row, "solution": solutions[str(row["ticket_id"])], "status": "Closed", "resolved_at": stamp}
+            for row in current
+        ]
+        res = sb.table("tickets").upsert(payload, on_conflict="ticket_id").execute()
+        if len(res.data or []) != len(payload):
+            raise RuntimeError(f"Failed to close tickets {i}-{i + len(batch) - 1}")
+        rows.extend(row_to_ticket(row) for row in res.data)
+    return rows
+
+
+async def aauthenticate_user(username: str, password: str) -> UserRow | None:
+    sb = await aget_supabase()
+    res = await (
+        sb.table("users")
+        .select("user_id, username, password, email, created_at")
+        .eq("username", username)
+        .limit(1)
+        .execute()
+    )
+    if not res.data:
+        return None
+    user = res.data[0]
+    if user.get("password") != password:
+        return None
+    return UserRow(**user)
+
+
+async def aget_user_by_id(user_id: str) -> UserRow | None:
+    sb = await aget_supabase()
+    res = await (
+        sb.table("users")
+        .select("user_id, username, password, email, created_at")
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    if not res.data:
+        return None
+    return UserRow(**res.data[0])
+
+
+async def alist_user_tickets(user_id: str, limit: int = 50) -> list[TicketRow]:
+    sb = await aget_supabase()
+    res = await (
         sb.table("tickets")
         .select(
             "ticket_id, user_id, ticket_title, issue_description, severity, status, solution, created_at, resolved_at"
         )
-        .eq("ticket_id", ticket_id)
-        .limit(1)
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .limit(limit)
         .execute()
     )
+    return [TicketRow(**row) for row in (res.data or [])]
+
+
+async def ainsert_ticket(
+    user_id: str,
+    ticket_title: str,
+    issue_description: str,
+    severity: str,
+    status: TicketStatus = "Open",
+) -> TicketRow:
+    sb = await aget_supabase()
+    payload = new_ticket_payload(user_id, ticket_title, issue_description, severity, status)
+    res = await sb.table("tickets").insert(payload).execute()
+    if not res.data:
+        raise RuntimeError("Failed to insert ticket")
+    return row_to_ticket(res.data[0])
+
+
+async def aupdate_ticket_solution(
+    ticket_id: str,
+    solution: str,
+    status: TicketStatus = "Closed",
+    resolved_at: datetime | None = None,
+    issue_description: str | None = None,
+) -> TicketRow:
+    sb = await aget_supabase()
+    payload: dict[str, Any] = {
+        "solution": solution,
+        "status": status,
+        "resolved_at": (resolved_at or datetime.utcnow()).isoformat(),
+    }
+    if issue_description is not None:
+        payload["issue_description"] = issue_description
+    res = await sb.table("tickets").update(payload).eq("ticket_id", ticket_id).execute()
     if not res.data:
-        raise RuntimeError("Failed to fetch updated ticket")
-    return TicketRow(**res.data[0])
+        raise RuntimeError("Failed to update ticket")
+    return row_to_ticket(res.data[0])
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from . import db
+from .config import settings
+from .embedding_cache import normalize_text
+from .llm import get_embeddings
+
+
+_stats = {"checked": 0, "hash_matches": 0, "embedding_matches": 0}
+_stats_lock = threading.Lock()
+
+
+def issue_hash(text: str | None) -> str:
+    return hashlib.sha1(normalize_text(text or "").casefold().encode("utf-8")).hexdigest()
+
+
+def _created_after(ticket: db.TicketRow, cutoff: datetime) -> bool:
+    if not ticket.created_at:
+        return True  # queued by write-behind, so it is as recent as it gets
+    created = datetime.fromisoformat(ticket.created_at)
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created >= cutoff
+
+
+def recent_open_tickets(user_id: str) -> list[db.TicketRow]:
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.duplicate_ticket_window_min)
+    tickets = db.list_user_tickets(user_id, limit=25)
+    if settings.ticket_write_behind:
+        from .persistence import get_persister
+
+        tickets = get_persister().pending_for_user(user_id) + tickets
+    seen: set[str] = set()
+    recent = []
+    for ticket in tickets:
+        if ticket.ticket_id in seen or ticket.status == "Closed" or not ticket.issue_description:
+            continue
+        seen.add(ticket.ticket_id)
+        if _created_after(ticket, cutoff):
+            recent.append(ticket)
+    return recent
+
+
+def find_duplicate_ticket(user_id: str, issue_description: str) -> db.TicketRow | None:
+    """The user's recent open ticket for the same problem, if any.
+
+    An identical normalized description matches by hash; otherwise the closest
+    description within `DUPLICATE_TICKET_DISTANCE` (squared L2 between
+    embeddings) matches.
+    """
+    if not settings.duplicate_ticket_check:
+        return None
+    candidates = recent_open_tickets(user_id)
+    with _stats_lock:
+        _stats["checked"] += 1
+    if not candidates:
+        return None
+
+    key = issue_hash(issue_description)
+    for ticket in candidates:
+        if issue_hash(ticket.issue_description) == key:
+            with _stats_lock:
+                _stats["hash_matches"] += 1
+            return ticket
+
+    # Both sides go through the embedding cache, and the new issue is embedded again
+    # for the similarity search anyway.
+    vectors = np.asarray(
+        get_embeddings().embed_documents([issue_description] + [t.issue_description for t in candidates]),
+        dtype=np.float32,
+    )
+    distances = ((vectors[1:] - vectors[0]) ** 2).sum(axis=1)
+    best = int(np.argmin(distances))
+    if distances[best] > settings.duplicate_ticket_distance:
+        return None
+    with _stats_lock:
+        _stats["embedding_matches"] += 1
+    return candidates[best]
+
+
+def duplicate_stats() -> dict[str, int]:
+    with _stats_lock:
+        return {**_stats, "duplicates_avoided": _stats["hash_matches"] + _stats["embedding_matches"]}
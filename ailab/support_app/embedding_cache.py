@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def _as_float32(vector: list[float]) -> list[float]:
+    # Round-trip through float32 so a fresh vector equals its cached copy.
+    return array("f", vector).tolist()
+
+
+class EmbeddingStore:
+    """SQLite-backed vector cache with least-recently-used eviction by total size."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute(
+            "create table if not exists embeddings ("
+            "key text primary key, vector blob not null, size integer not null, last_used real not null)"
+        )
+        self._conn.execute("create index if not exists embeddings_last_used on embeddings(last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), 500):
+                batch = unique[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"select key, vector from embeddings where key in ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "update embeddings set last_used = ? where key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = array("f", vector).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            self._conn.executemany(
+                "insert or replace into embeddings (key, vector, size, last_used) values (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("select coalesce(sum(size), 0) from embeddings").fetchone()[0])
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size_bytes": self.size_bytes(),
+        }
+
+    def _evict(self) -> None:
+        total = int(self._conn.execute("select coalesce(sum(size), 0) from embeddings").fetchone()[0])
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so steady-state inserts don't evict on every write.
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        doomed: list[str] = []
+        for key, size in self._conn.execute("select key, size from embeddings order by last_used"):
+            if total - freed <= target:
+                break
+            doomed.append(key)
+            freed += size
+        self._conn.executemany("delete from embeddings where key = ?", [(k,) for k in doomed])
+        self.evictions += len(doomed)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, model: str, store: EmbeddingStore) -> None:
+        self.inner = inner
+        self.model = model
+        self.store = store
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        normalized = [normalize_text(t) for t in texts]
+        keys = [cache_key(self.model, t) for t in normalized]
+        found = self.store.get_many(keys)
+
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, normalized):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.inner.embed_documents(list(missing.values()))
+            fresh = {key: _as_float32(v) for key, v in zip(missing.keys(), vectors)}
+            self.store.put_many(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        normalized = normalize_text(text)
+        key = cache_key(self.model, normalized)
+        found = self.store.get_many([key])
+        if key in found:
+            return found[key]
+        vector = _as_float32(self.inner.embed_query(normalized))
+        self.store.put_many({key: vector})
+        return vector
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from langchain_core.embeddings import Embeddings
+
+from .config import settings
+
+
+_encoder: Any = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+    if _encoder is False:
+        return len(text) // 4 + 1
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+def chunk_by_tokens(texts: list[str], max_tokens: int, max_items: int) -> list[list[int]]:
+    """Group text positions into chunks that stay under both budgets."""
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    budget = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (budget + tokens > max_tokens or len(current) >= max_items):
+            chunks.append(current)
+            current, budget = [], 0
+        current.append(i)
+        budget += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def embed_documents_bulk(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """Embed many texts in token-bounded chunks on a bounded worker pool.
+
+    Chunks that fail are retried with backoff; finished chunks are never redone.
+    """
+    if not texts:
+        return []
+    chunks = chunk_by_tokens(
+        texts,
+        max_tokens=settings.embedding_batch_tokens,
+        max_items=settings.embedding_batch_size,
+    )
+    if len(chunks) == 1:
+        return embeddings.embed_documents(texts)
+
+    results: list[list[float] | None] = [None] * len(texts)
+    pending = list(range(len(chunks)))
+    errors: dict[int, Exception] = {}
+
+    def run(chunk_no: int) -> None:
+        positions = chunks[chunk_no]
+        vectors = embeddings.embed_documents([texts[i] for i in positions])
+        for i, vector in zip(positions, vectors):
+            results[i] = vector
+
+    workers = max(1, min(settings.embedding_workers, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+        for attempt in range(settings.embedding_max_retries + 1):
+            if attempt:
+                time.sleep(min(30.0, 2.0 ** (attempt - 1)))
+            futures = {chunk_no: pool.submit(run, chunk_no) for chunk_no in pending}
+            errors = {}
+            for chunk_no, future in futures.items():
+                try:
+                    future.result()
+                except Exception as exc:
+                    errors[chunk_no] = exc
+            pending = sorted(errors)
+            if not pending:
+                break
+
+    if pending:
+        raise RuntimeError(
+            f"Embedding failed for {len(pending)} of {len(chunks)} chunks"
+        ) from errors[pending[0]]
+    return results  # type: ignore[return-value]
@@ -1,18 +1,36 @@
 from __future__ import annotations
 
-from typing import Any, Literal, TypedDict
-
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterator, Literal, TypedDict
+from uuid import uuid4
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
+from langgraph.types import Command, interrupt
 
 from . import db
 from .agents import (
+    ClarificationOutput,
+    ConversationOutput,
+    TextCallback,
+    arun_clarification_and_solution,
+    arun_conversation_agent,
     format_reused_solution,
     run_clarification_and_solution,
     run_conversation_agent,
 )
 from .config import settings
-from .similarity import SimilarityIndex
-from .types import SimilarityHit, TicketDraft
+from .duplicates import find_duplicate_ticket, issue_hash
+from .persistence import get_persister
+from .similarity import get_ticket_index
+from .triage import classify
+from .types import SimilarityHit, SimilarityRef, TicketDraft
 
 
 class GraphState(TypedDict, total=False):
@@ -21,42 +39,92 @@ class GraphState(TypedDict, total=False):
 
     needs_ticket: bool
     assistant_message: str
+    decided_by: Literal["rules", "llm"]
 
-    ticket_draft: TicketDraft
+    ticket_draft: TicketDraft | None
     created_ticket_id: str
+    duplicate_of: str
+    duplicate_solution: str
+    speculation_id: str
 
-    user_closed_tickets: list[dict[str, Any]]
-    other_closed_tickets: list[dict[str, Any]]
-
-    user_similarity_hits: list[SimilarityHit]
-    other_similarity_hits: list[SimilarityHit]
+    user_similarity_hits: list[SimilarityRef]
+    other_similarity_hits: list[SimilarityRef]
 
     selected_solution: str
-    selected_solution_source: Literal["user_history", "other_users", "new_solution"]
+    selected_solution_source: Literal["user_history", "other_users", "new_solution", "existing_ticket"] | None
     needs_confirmation: bool
     confirmation_question: str
 
 
-def conversation_agent_node(state: GraphState) -> GraphState:
-    out = run_conversation_agent(state["user_message"])
+def triage_node(state: GraphState) -> GraphState:
+    # Always set decided_by: with checkpointing, the previous turn's value is still in the state.
+    result = classify(state["user_message"]) if settings.triage_fast_path else None
+    if result is None:
+        return {"decided_by": "llm"}
+    new_state: GraphState = {
+        "needs_ticket": result.needs_ticket,
+        "assistant_message": result.message,
+        "decided_by": "rules",
+    }
+    if result.ticket is not None:
+        new_state["ticket_draft"] = result.ticket
+    return new_state
+
+
+def _conversation_state(out: ConversationOutput) -> GraphState:
+    # Without a draft there is nothing to file, whatever the model said.
+    needs_ticket = out.needs_ticket and out.ticket is not None
     new_state: GraphState = {
-        "needs_ticket": out.needs_ticket,
+        "needs_ticket": needs_ticket,
         "assistant_message": out.message,
+        "decided_by": "llm",
     }
-    if out.needs_ticket and out.ticket is not None:
+    if needs_ticket:
         new_state["ticket_draft"] = out.ticket
     return new_state
 
 
-def ticket_creation_node(state: GraphState) -> GraphState:
+def _text_writer(config: RunnableConfig | None, prefix: str = "") -> TextCallback | None:
+    """Forward LLM text to the graph's custom stream when the run asked for it.
+
+    `prefix` is sent ahead of the first piece, so the streamed text matches how
+    the node's output is joined into `assistant_message`.
+    """
+    if not (config or {}).get("configurable", {}).get("stream_text"):
+        return None
+    write = get_stream_writer()
+    started = False
+
+    def on_text(text: str) -> None:
+        nonlocal started
+        write({"text": text if started else prefix + text})
+        started = True
+
+    return on_text
+
+
+def conversation_agent_node(state: GraphState, config: RunnableConfig) -> GraphState:
+    out = run_conversation_agent(state["user_message"], on_text=_text_writer(config))
+    return _conversation_state(out)
+
+
+async def aconversation_agent_node(state: GraphState, config: RunnableConfig) -> GraphState:
+    out = await arun_conversation_agent(state["user_message"], on_text=_text_writer(config))
+    return _conversation_state(out)
+
+
+def _ticket_fields(state: GraphState) -> dict:
     draft = state["ticket_draft"]
-    ticket = db.insert_ticket(
-        user_id=state["user_id"],
-        ticket_title=draft["ticket_title"],
-        issue_description=draft["issue_description"],
-        severity=draft["severity"],
-        status="Open",
-    )
+    return {
+        "user_id": state["user_id"],
+        "ticket_title": draft["ticket_title"],
+        "issue_description": draft["issue_description"],
+        "severity": draft["severity"],
+        "status": "Open",
+    }
+
+
+def _created_state(state: GraphState, ticket: db.TicketRow) -> GraphState:
     return {
         "created_ticket_id": ticket.ticket_id,
         "assistant_message": (
@@ -66,25 +134,122 @@ def ticket_creation_node(state: GraphState) -> GraphState:
     }
 
 
-def ticket_resolution_agent_node(state: GraphState) -> GraphState:
-    user_closed = db.list_closed_tickets_for_user(state["user_id"], limit=200)
-    other_closed = db.list_closed_tickets_other_users(state["user_id"], limit=400)
-
+def _duplicate_state(state: GraphState, ticket: db.TicketRow) -> GraphState:
+    """Continue the user's open ticket: the new message becomes extra detail for resolving it."""
+    draft = dict(state["ticket_draft"])
+    draft["issue_description"] = ticket.issue_description or draft["issue_description"]
+    if issue_hash(state["ticket_draft"]["issue_description"]) != issue_hash(draft["issue_description"]):
+        draft["issue_description"] += f"\n\nAdditional details from the user: {state['user_message']}"
     return {
-        "user_closed_tickets": [t.__dict__ for t in user_closed],
-        "other_closed_tickets": [t.__dict__ for t in other_closed],
+        "created_ticket_id": ticket.ticket_id,
+        "duplicate_of": ticket.ticket_id,
+        "duplicate_solution": ticket.solution or "",
+        "ticket_draft": draft,
+        "assistant_message": (
+            state.get("assistant_message", "")
+            + f"\n\nThis matches your open ticket `{ticket.ticket_id}` (Severity: {ticket.severity}, "
+            f"Status: {ticket.status}), so I've added it there instead of opening a new one."
+        ),
     }
 
 
-def similarity_check_node(state: GraphState) -> GraphState:
+def ticket_creation_node(state: GraphState) -> GraphState:
+    duplicate = find_duplicate_ticket(state["user_id"], state["ticket_draft"]["issue_description"])
+    if duplicate is not None:
+        return _duplicate_state(state, duplicate)
+    if settings.ticket_write_behind:
+        return _created_state(state, get_persister().insert_ticket(**_ticket_fields(state)))
+    return _created_state(state, db.insert_ticket(**_ticket_fields(state)))
+
+
+async def aticket_creation_node(state: GraphState) -> GraphState:
+    duplicate = await asyncio.to_thread(
+        find_duplicate_ticket, state["user_id"], state["ticket_draft"]["issue_description"]
+    )
+    if duplicate is not None:
+        return _duplicate_state(state, duplicate)
+    if settings.ticket_write_behind:
+        return _created_state(state, get_persister().insert_ticket(**_ticket_fields(state)))
+    return _created_state(state, await db.ainsert_ticket(**_ticket_fields(state)))
+
+
+# Speculative solution calls started alongside retrieval, keyed by the run's speculation_id.
+# Kept out of the graph state so the state stays plain data.
+_speculations: OrderedDict[str, Future | asyncio.Task] = OrderedDict()
+_speculations_lock = threading.Lock()
+_speculation_pool: ThreadPoolExecutor | None = None
+speculation_stats = {"started": 0, "used": 0, "discarded": 0}
+_MAX_SPECULATIONS = 256
+
+
+def _register_speculation(call: Future | asyncio.Task) -> GraphState:
+    speculation_id = uuid4().hex
+    with _speculations_lock:
+        _speculations[speculation_id] = call
+        speculation_stats["started"] += 1
+        # Runs that failed before similarity_check never claim their call.
+        while len(_speculations) > _MAX_SPECULATIONS:
+            _speculations.popitem(last=False)[1].cancel()
+    return {"speculation_id": speculation_id}
+
+
+def _start_speculation(state: GraphState) -> GraphState:
+    global _speculation_pool
+    if not settings.speculative_solution:
+        return {}
+    with _speculations_lock:
+        if _speculation_pool is None:
+            _speculation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculate")
+    issue = state["ticket_draft"]["issue_description"]
+    return _register_speculation(_speculation_pool.submit(run_clarification_and_solution, issue))
+
+
+def _astart_speculation(state: GraphState) -> GraphState:
+    if not settings.speculative_solution:
+        return {}
     issue = state["ticket_draft"]["issue_description"]
+    return _register_speculation(asyncio.create_task(arun_clarification_and_solution(issue)))
+
+
+def _claim_speculation(state: GraphState, used: bool) -> Future | asyncio.Task | None:
+    """Take this run's speculative call; cancel it (and return None) when it isn't used."""
+    with _speculations_lock:
+        call = _speculations.pop(state.get("speculation_id", ""), None)
+        if call is not None:
+            speculation_stats["used" if used else "discarded"] += 1
+    if call is not None and not used:
+        call.cancel()
+        return None
+    return call
+
+
+def ticket_resolution_agent_node(state: GraphState) -> GraphState:
+    update = _start_speculation(state)
+    get_ticket_index().sync()
+    return update
+
+
+async def aticket_resolution_agent_node(state: GraphState) -> GraphState:
+    update = _astart_speculation(state)
+    # The index sync mixes paging, embedding and numpy work behind a lock; keep it off the loop.
+    await asyncio.to_thread(get_ticket_index().sync)
+    return update
+
+
+def _search_hits(state: GraphState) -> tuple[list[SimilarityHit], list[SimilarityHit]]:
+    return get_ticket_index().search_partitioned(
+        state["user_id"],
+        state["ticket_draft"]["issue_description"],
+        k=5,
+        radius=settings.similarity_threshold,
+    )
 
-    user_index = SimilarityIndex.from_closed_tickets(state.get("user_closed_tickets", []))
-    other_index = SimilarityIndex.from_closed_tickets(state.get("other_closed_tickets", []))
 
-    user_hits = user_index.search(issue, k=5)
-    other_hits = other_index.search(issue, k=5)
+def _refs(hits: list[SimilarityHit]) -> list[SimilarityRef]:
+    return [{"ticket_id": h["ticket_id"], "score": h["score"]} for h in hits]
 
+
+def _reuse_state(user_hits: list[SimilarityHit], other_hits: list[SimilarityHit]) -> GraphState | None:
     def best_over_threshold(hits: list[SimilarityHit]) -> SimilarityHit | None:
         if not hits:
             return None
@@ -96,8 +261,8 @@ def similarity_check_node(state: GraphState) -> GraphState:
     best_user = best_over_threshold(user_hits)
     if best_user is not None:
         return {
-            "user_similarity_hits": user_hits,
-            "other_similarity_hits": other_hits,
+            "user_similarity_hits": _refs(user_hits),
+            "other_similarity_hits": _refs(other_hits),
             "selected_solution": format_reused_solution(
                 best_user["solution"], source="from your previous ticket history"
             ),
@@ -109,8 +274,8 @@ def similarity_check_node(state: GraphState) -> GraphState:
     best_other = best_over_threshold(other_hits)
     if best_other is not None:
         return {
-            "user_similarity_hits": user_hits,
-            "other_similarity_hits": other_hits,
+            "user_similarity_hits": _refs(user_hits),
+            "other_similarity_hits": _refs(other_hits),
             "selected_solution": format_reused_solution(
                 best_other["solution"], source="from other users' resolved tickets"
             ),
@@ -120,8 +285,19 @@ def similarity_check_node(state: GraphState) -> GraphState:
                 "Does this match what you're seeing (e.g., same error message / same login method / same device)?"
             ),
         }
+    return None
+
+
+def _existing_ticket_state(state: GraphState) -> GraphState:
+    return {
+        "selected_solution": state["duplicate_solution"],
+        "selected_solution_source": "existing_ticket",
+        "needs_confirmation": False,
+        "confirmation_question": "",
+    }
 
-    clar = run_clarification_and_solution(issue)
+
+def _new_solution_state(clar: ClarificationOutput) -> GraphState:
     if clar.needs_more_info and clar.clarifying_questions:
         questions = "\n".join(f"- {q}" for q in clar.clarifying_questions)
         solution_text = (
@@ -143,6 +319,49 @@ def similarity_check_node(state: GraphState) -> GraphState:
     }
 
 
+def _separator(state: GraphState) -> str:
+    # Matches how solution_response_node joins the solution onto the reply so far.
+    return "\n\n" if state.get("assistant_message") else ""
+
+
+def _speculation_usable(state: GraphState, reused: GraphState | None) -> bool:
+    # A matched open ticket replaces the draft the speculative call was started with.
+    return reused is None and not state.get("duplicate_of")
+
+
+def similarity_check_node(state: GraphState, config: RunnableConfig) -> GraphState:
+    if state.get("duplicate_solution"):
+        _claim_speculation(state, used=False)
+        return _existing_ticket_state(state)
+    reused = _reuse_state(*_search_hits(state))
+    speculation = _claim_speculation(state, used=_speculation_usable(state, reused))
+    if reused is not None:
+        return reused
+    if isinstance(speculation, Future):
+        # Started before retrieval, so it can't stream; its text arrives with this node's update.
+        return _new_solution_state(speculation.result())
+    issue = state["ticket_draft"]["issue_description"]
+    clar = run_clarification_and_solution(issue, on_text=_text_writer(config, prefix=_separator(state)))
+    return _new_solution_state(clar)
+
+
+async def asimilarity_check_node(state: GraphState, config: RunnableConfig) -> GraphState:
+    if state.get("duplicate_solution"):
+        _claim_speculation(state, used=False)
+        return _existing_ticket_state(state)
+    reused = _reuse_state(*await asyncio.to_thread(_search_hits, state))
+    speculation = _claim_speculation(state, used=_speculation_usable(state, reused))
+    if reused is not None:
+        return reused
+    if isinstance(speculation, asyncio.Task):
+        return _new_solution_state(await speculation)
+    if isinstance(speculation, Future):
+        return _new_solution_state(await asyncio.wrap_future(speculation))
+    issue = state["ticket_draft"]["issue_description"]
+    clar = await arun_clarification_and_solution(issue, on_text=_text_writer(config, prefix=_separator(state)))
+    return _new_solution_state(clar)
+
+
 def solution_response_node(state: GraphState) -> GraphState:
     msg = state.get("assistant_message", "")
     msg = (msg + "\n\n" if msg else "") + state["selected_solution"]
@@ -151,57 +370,251 @@ def solution_response_node(state: GraphState) -> GraphState:
     return {"assistant_message": msg}
 
 
-def update_ticket_node(state: GraphState) -> GraphState:
-    if not state.get("created_ticket_id"):
-        return {}
+def _awaiting_clarification(state: GraphState) -> bool:
+    return state.get("selected_solution_source") == "new_solution" and state.get(
+        "selected_solution", ""
+    ).strip().startswith("I need a bit more information")
+
+
+def _solution_to_store(state: GraphState) -> str | None:
+    if not state.get("created_ticket_id") or state.get("duplicate_solution"):
+        return None
 
     if state.get("selected_solution_source") != "new_solution":
-        db.update_ticket_solution(
-            ticket_id=state["created_ticket_id"],
-            solution=state["selected_solution"],
-            status="Closed",
-        )
-        return {}
+        return state["selected_solution"]
 
     solution_text = state.get("selected_solution", "")
-    if solution_text.strip().startswith("I need a bit more information"):
-        return {}
+    if _awaiting_clarification(state):
+        return None
+    return solution_text if solution_text.strip() else None
 
-    if solution_text.strip():
-        db.update_ticket_solution(
-            ticket_id=state["created_ticket_id"],
-            solution=solution_text,
-            status="Closed",
-        )
+
+def _close_fields(state: GraphState, solution: str) -> dict:
+    # The draft picks up clarification answers, so store it along with the solution.
+    return {
+        "ticket_id": state["created_ticket_id"],
+        "solution": solution,
+        "issue_description": state["ticket_draft"]["issue_description"],
+    }
+
+
+def update_ticket_node(state: GraphState) -> GraphState:
+    solution = _solution_to_store(state)
+    if solution is not None and settings.ticket_write_behind:
+        # The persister indexes the ticket once the close lands.
+        get_persister().close_ticket(**_close_fields(state, solution))
+    elif solution is not None:
+        ticket = db.update_ticket_solution(**_close_fields(state, solution), status="Closed")
+        get_ticket_index().add_closed_ticket(ticket)
+    return {}
+
+
+async def aupdate_ticket_node(state: GraphState) -> GraphState:
+    solution = _solution_to_store(state)
+    if solution is not None and settings.ticket_write_behind:
+        get_persister().close_ticket(**_close_fields(state, solution))
+    elif solution is not None:
+        ticket = await db.aupdate_ticket_solution(**_close_fields(state, solution), status="Closed")
+        await asyncio.to_thread(get_ticket_index().add_closed_ticket, ticket)
     return {}
 
 
-def _route_after_conversation(state: GraphState) -> str:
-    return "ticket_creation" if state.get("needs_ticket") else END
+def await_clarification_node(state: GraphState) -> GraphState:
+    """Pause until the user answers the clarifying questions, then fold the answer into the draft.
 
+    The next message on the same conversation resumes here, so the existing
+    ticket and draft are reused instead of classifying and inserting again.
+    """
+    answer = interrupt({"questions": state["selected_solution"]})
+    draft = dict(state["ticket_draft"])
+    draft["issue_description"] = f"{draft['issue_description']}\n\nAdditional details from the user: {answer}"
+    return {"ticket_draft": draft, "user_message": answer, "assistant_message": ""}
 
-def build_graph():
+
+def _route_after_update(state: GraphState) -> str:
+    return "await_clarification" if _awaiting_clarification(state) else END
+
+
+def _route_after_triage(state: GraphState) -> str | list[str]:
+    if state.get("decided_by") != "rules":
+        return "conversation_agent"
+    return _route_after_conversation(state)
+
+
+def _route_after_conversation(state: GraphState) -> str | list[str]:
+    if not state.get("needs_ticket"):
+        return END
+    # The index sync doesn't need the new ticket: insert it while the index catches
+    # up, and join before similarity scoring.
+    return ["ticket_creation", "ticket_resolution_agent"]
+
+
+def build_graph(checkpointer=None):
+    """Compile the support graph; with a checkpointer, clarification rounds pause and resume."""
     g = StateGraph(GraphState)
 
-    g.add_node("conversation_agent", conversation_agent_node)
-    g.add_node("ticket_creation", ticket_creation_node)
-    g.add_node("ticket_resolution_agent", ticket_resolution_agent_node)
-    g.add_node("similarity_check", similarity_check_node)
+    # Each I/O node carries a sync and an async body, so the same compiled graph
+    # serves both `invoke` and `ainvoke`.
+    g.add_node("triage", triage_node)
+    g.add_node("conversation_agent", RunnableLambda(conversation_agent_node, afunc=aconversation_agent_node))
+    g.add_node("ticket_creation", RunnableLambda(ticket_creation_node, afunc=aticket_creation_node))
+    g.add_node(
+        "ticket_resolution_agent",
+        RunnableLambda(ticket_resolution_agent_node, afunc=aticket_resolution_agent_node),
+    )
+    g.add_node("similarity_check", RunnableLambda(similarity_check_node, afunc=asimilarity_check_node))
     g.add_node("solution_response", solution_response_node)
-    g.add_node("update_ticket", update_ticket_node)
+    g.add_node("update_ticket", RunnableLambda(update_ticket_node, afunc=aupdate_ticket_node))
 
-    g.set_entry_point("conversation_agent")
-    g.add_conditional_edges("conversation_agent", _route_after_conversation)
+    g.set_entry_point("triage")
+    g.add_conditional_edges(
+        "triage",
+        _route_after_triage,
+        ["conversation_agent", "ticket_creation", "ticket_resolution_agent", END],
+    )
+    g.add_conditional_edges(
+        "conversation_agent",
+        _route_after_conversation,
+        ["ticket_creation", "ticket_resolution_agent", END],
+    )
 
-    g.add_edge("ticket_creation", "ticket_resolution_agent")
-    g.add_edge("ticket_resolution_agent", "similarity_check")
+    g.add_edge(["ticket_creation", "ticket_resolution_agent"], "similarity_check")
     g.add_edge("similarity_check", "solution_response")
     g.add_edge("solution_response", "update_ticket")
-    g.add_edge("update_ticket", END)
+    if checkpointer is None:
+        g.add_edge("update_ticket", END)
+    else:
+        g.add_node("await_clarification", await_clarification_node)
+        g.add_conditional_edges("update_ticket", _route_after_update, ["await_clarification", END])
+        g.add_edge("await_clarification", "similarity_check")
+
+    return g.compile(checkpointer=checkpointer)
+
+
+_compiled_graph = None
+_compiled_graph_lock = threading.Lock()
+
 
-    return g.compile()
+def _checkpoint_path() -> str | None:
+    path = settings.checkpoint_path
+    if path and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path or None
+
+
+def get_graph():
+    global _compiled_graph
+    if _compiled_graph is None:
+        with _compiled_graph_lock:
+            if _compiled_graph is None:
+                checkpointer = None
+                path = _checkpoint_path()
+                if path:
+                    from langgraph.checkpoint.sqlite import SqliteSaver
+
+                    checkpointer = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+                _compiled_graph = build_graph(checkpointer)
+    return _compiled_graph
+
+
+
+
+def _thread_config(user_id: str, conversation_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": f"{user_id}:{conversation_id}"}}
+
+
+def _turn_input(snapshot: Any, user_id: str, user_message: str) -> GraphState | Command:
+    """Resume a conversation paused on clarifying questions, otherwise start a fresh turn.
+
+    Only a pending interrupt means "waiting for an answer": a turn that failed
+    part-way also leaves `next` set, and that turn is dropped rather than re-run.
+    """
+    if snapshot is not None and snapshot.interrupts:
+        return Command(resume=user_message)
+    # Reset every per-turn field; a checkpointed thread would otherwise carry them over.
+    return {
+        "user_id": user_id,
+        "user_message": user_message,
+        "needs_ticket": False,
+        "assistant_message": "",
+        "ticket_draft": None,
+        "created_ticket_id": "",
+        "duplicate_of": "",
+        "duplicate_solution": "",
+        "speculation_id": "",
+        "user_similarity_hits": [],
+        "other_similarity_hits": [],
+        "selected_solution": "",
+        "selected_solution_source": None,
+        "needs_confirmation": False,
+        "confirmation_question": "",
+    }
 
 
-def run_support_flow(user_id: str, user_message: str) -> GraphState:
-    app = build_graph()
-    return app.invoke({"user_id": user_id, "user_message": user_message})
+def run_support_flow(user_id: str, user_message: str, conversation_id: str = "default") -> GraphState:
+    app = get_graph()
+    config = _thread_config(user_id, conversation_id)
+    snapshot = app.get_state(config) if app.checkpointer else None
+    return app.invoke(_turn_input(snapshot, user_id, user_message), config=config)
+
+
+async def arun_support_flow(user_id: str, user_message: str, conversation_id: str = "default") -> GraphState:
+    app = get_graph()
+    config = _thread_config(user_id, conversation_id)
+    if not app.checkpointer:
+        return await app.ainvoke(_turn_input(None, user_id, user_message), config=config)
+
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    # SqliteSaver is sync-only; open an async saver on the same file for this run.
+    # A short-lived connection also avoids aiosqlite's worker thread outliving the loop.
+    async with AsyncSqliteSaver.from_conn_string(settings.checkpoint_path) as saver:
+        app = app.copy(update={"checkpointer": saver})
+        snapshot = await app.aget_state(config)
+        return await app.ainvoke(_turn_input(snapshot, user_id, user_message), config=config)
+
+
+class SupportFlowStream:
+    """Iterate the assistant reply as text pieces; `result` holds the final state afterwards.
+
+    LLM nodes stream their tokens. Text that no LLM streams (the ticket line,
+    a reused solution, clarifying questions) is sent as soon as the node that
+    wrote it finishes. Every intermediate `assistant_message` is a prefix of
+    the final reply, so only the unsent tail is emitted.
+    """
+
+    def __init__(self, user_id: str, user_message: str, conversation_id: str = "default") -> None:
+        self.user_id = user_id
+        self.user_message = user_message
+        self.conversation_id = conversation_id
+        self.result: GraphState = {}
+
+    def __iter__(self) -> Iterator[str]:
+        app = get_graph()
+        config = _thread_config(self.user_id, self.conversation_id)
+        config["configurable"]["stream_text"] = True
+        snapshot = app.get_state(config) if app.checkpointer else None
+        sent = ""
+        state: dict[str, Any] = dict(snapshot.values) if snapshot is not None else {}
+        for mode, chunk in app.stream(
+            _turn_input(snapshot, self.user_id, self.user_message),
+            config=config,
+            stream_mode=["custom", "updates"],
+        ):
+            if mode == "custom":
+                sent += chunk["text"]
+                yield chunk["text"]
+                continue
+            for update in chunk.values():
+                if not isinstance(update, dict):
+                    continue  # e.g. the `__interrupt__` marker
+                state.update(update)
+                message = update.get("assistant_message")
+                if message and message.startswith(sent) and len(message) > len(sent):
+                    yield message[len(sent) :]
+                    sent = message
+        self.result = state
+
+
+def stream_support_flow(user_id: str, user_message: str, conversation_id: str = "default") -> SupportFlowStream:
+    return SupportFlowStream(user_id, user_message, conversation_id)
@@ -0,0 +1,59 @@
+"""Break down where import time goes for the app's modules.
+
+    python -m support_app.importtime_report support_app.graph --top 20
+
+Runs the import in a fresh interpreter with `-X importtime` so nothing is
+already cached in `sys.modules`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def measure(modules: list[str]) -> list[tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for every module imported."""
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Report import cost per module and package.")
+    parser.add_argument("modules", nargs="*", default=["support_app.graph"])
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rows = measure(args.modules)
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    total = sum(by_package.values())
+
+    print(f"Total import time: {total / 1000:.0f} ms across {len(rows)} modules")
+    print(f"\n{'package':<32} {'self ms':>9} {'share':>7}")
+    for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"{package:<32} {us / 1000:>9.1f} {us / total:>7.1%}")
+    print(f"\n{'module':<48} {'cumulative ms':>14}")
+    for name, _, cumulative_us in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"{name:<48} {cumulative_us / 1000:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
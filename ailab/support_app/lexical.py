@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from typing import Callable
+
+from .embedding_cache import normalize_text
+
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:['.@_-][a-z0-9]+)*")
+# Function words only: negations, "can"/"cant", "in"/"out" and "up" change what the issue
+# means and must stay in the token list.
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from i im is it its me my of on or so that the this "
+    "to was we with you your".split()
+)
+_ALIASES = {"cannot": "cant", "couldnt": "cant", "unable": "cant"}
+
+LexicalMatch = tuple[int, float]  # (row position, confidence in [0, 1])
+
+
+def _words(text: str) -> list[str]:
+    tokens = _TOKEN.findall(normalize_text(text).casefold().replace("’", "'"))
+    return [t.replace("'", "") for t in tokens]
+
+
+def tokenize(text: str) -> list[str]:
+    return [_ALIASES.get(t, t) for t in _words(text) if t not in _STOPWORDS]
+
+
+def text_key(text: str) -> str:
+    """Exact-match key: every word of the casefolded text; only whitespace and punctuation are ignored."""
+    return hashlib.sha1(" ".join(_words(text)).encode("utf-8")).hexdigest()
+
+
+class LexicalIndex:
+    """BM25 inverted index over issue text, keyed by the same row positions as `SimilarityIndex`.
+
+    Besides BM25 ranking, each match gets a confidence: the IDF-weighted Dice
+    overlap of the query and row term sets. Only exact text matches, including
+    the issue text of collapsed duplicates, score 1.0.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self) -> None:
+        self.postings: dict[str, dict[int, int]] = {}
+        self.doc_terms: list[tuple[str, ...]] = []
+        self.doc_lengths: list[int] = []
+        self.total_length = 0
+        self.exact: dict[str, list[int]] = {}
+        # Exact keys of collapsed members' issue text, by row; the entries don't keep that text.
+        self.member_keys: dict[int, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def add(self, position: int, text: str) -> None:
+        if position != len(self.doc_terms):
+            raise ValueError(f"Expected row {len(self.doc_terms)}, got {position}")
+        tokens = tokenize(text)
+        counts: dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            self.postings.setdefault(token, {})[position] = tf
+        self.doc_terms.append(tuple(counts))
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        self._add_key(position, text_key(text))
+
+    def add_member(self, position: int, text: str) -> None:
+        if text:
+            self.add_member_key(position, text_key(text))
+
+    def add_member_key(self, position: int, key: str) -> None:
+        if self._add_key(position, key):
+            self.member_keys.setdefault(position, []).append(key)
+
+    def _add_key(self, position: int, key: str) -> bool:
+        rows = self.exact.setdefault(key, [])
+        if position in rows:
+            return False
+        rows.append(position)
+        return True
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (len(self.doc_terms) - df + 0.5) / (df + 0.5))
+
+    def search(
+        self, query: str, k: int, accept: Callable[[int], bool] | None = None
+    ) -> list[LexicalMatch]:
+        """Return up to `k` matches: exact ones first, then by BM25 score."""
+        exact = [p for p in self.exact.get(text_key(query), []) if accept is None or accept(p)]
+        terms = set(tokenize(query))
+        if not terms or not self.doc_terms:
+            return [(p, 1.0) for p in exact[:k]]
+
+        idf = {t: self.idf(t) for t in terms}
+        avg_length = self.total_length / len(self.doc_terms) or 1.0
+        scores: dict[int, float] = {}
+        for term in terms:
+            for position, tf in self.postings.get(term, {}).items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / avg_length)
+                scores[position] = scores.get(position, 0.0) + idf[term] * tf * (self.k1 + 1) / (tf + norm)
+
+        seen = set(exact)
+        ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+        matches: list[LexicalMatch] = [(p, 1.0) for p in exact]
+        query_mass = sum(idf.values())
+        for position in ranked:
+            if len(matches) >= k:
+                break
+            if position in seen or (accept is not None and not accept(position)):
+                continue
+            doc_terms = self.doc_terms[position]
+            doc_mass = sum(idf[t] if t in idf else self.idf(t) for t in doc_terms)
+            shared = sum(idf[t] for t in doc_terms if t in idf)
+            # Same terms in a different text still falls short of an exact match.
+            matches.append((position, min(0.999, 2.0 * shared / (query_mass + doc_mass or 1.0))))
+        return matches[:k]
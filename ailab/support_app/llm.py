@@ -1,11 +1,26 @@
-import httpx
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+import httpx
 
 from .config import settings
+from .embedding_cache import CachedEmbeddings, EmbeddingStore
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+    from langchain_openai import ChatOpenAI
 
 
 _http_client: httpx.Client | None = None
+_async_http_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+_embedding_store: EmbeddingStore | None = None
 
 
 def _get_http_client() -> httpx.Client:
@@ -15,7 +30,119 @@ def _get_http_client() -> httpx.Client:
     return _http_client
 
 
+def _get_async_http_client() -> httpx.AsyncClient | None:
+    """Async client for the running event loop, or None when called from sync code."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = _async_http_clients.setdefault(loop, httpx.AsyncClient(verify=False))
+    return client
+
+
+class Singleflight:
+    """Coalesce concurrent identical calls: one runs, the others wait for its result.
+
+    Sync and async callers share the same in-flight table, so a thread and a
+    coroutine asking for the same key still make only one call. Nothing is kept
+    once the call finishes; this is not a cache.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, Future] = {}
+        self._followers: dict[Hashable, int] = {}
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                self._followers[key] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            self._followers[key] = 0
+            self.calls += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                del self._followers[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return (result, shared); `shared` is True when another caller's call was reused."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._finish(key, future)
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Async `do`. The call runs in its own task and every caller waits through a shield,
+        so cancelling one caller never cancels the shared call for the others; the call
+        itself is cancelled only when its starter is cancelled and nobody else waits."""
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except asyncio.CancelledError:
+                with self._lock:
+                    if self._inflight.get(key) is future:
+                        self._followers[key] -= 1
+                raise
+        task = asyncio.ensure_future(fn())
+        task.add_done_callback(lambda t: self._settle(key, future, t))
+        try:
+            return await asyncio.shield(task), False
+        except asyncio.CancelledError:
+            with self._lock:
+                abandoned = self._inflight.get(key) is future and not self._followers[key]
+                if abandoned:
+                    # Later callers start a fresh call instead of joining a cancelled one.
+                    del self._inflight[key]
+                    del self._followers[key]
+            if abandoned:
+                task.cancel()
+            raise
+
+    def _settle(self, key: Hashable, future: Future, task: asyncio.Future) -> None:
+        try:
+            if future.done():
+                return
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        finally:
+            self._finish(key, future)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+chat_singleflight = Singleflight()
+
+
 def get_chat_llm() -> ChatOpenAI:
+    from langchain_openai import ChatOpenAI
+
     settings.validate()
     base_url = settings.openai_base_url or None
     return ChatOpenAI(
@@ -23,15 +150,38 @@ def get_chat_llm() -> ChatOpenAI:
         model=settings.openai_model,
         api_key=settings.openai_api_key,
         http_client=_get_http_client(),
+        http_async_client=_get_async_http_client(),
     )
 
 
-def get_embeddings() -> OpenAIEmbeddings:
+def embedding_model_id() -> str:
+    dims = settings.openai_embeddings_dimensions
+    return f"{settings.openai_embeddings_model}@{dims}" if dims else settings.openai_embeddings_model
+
+
+def get_embedding_store() -> EmbeddingStore | None:
+    global _embedding_store
+    if _embedding_store is None and settings.embedding_cache_path:
+        _embedding_store = EmbeddingStore(
+            settings.embedding_cache_path,
+            max_bytes=int(settings.embedding_cache_max_mb * 1024 * 1024),
+        )
+    return _embedding_store
+
+
+def get_embeddings() -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings
+
     settings.validate()
     base_url = settings.openai_base_url or None
-    return OpenAIEmbeddings(
+    embeddings = OpenAIEmbeddings(
         base_url=base_url,
         model=settings.openai_embeddings_model,
+        dimensions=settings.openai_embeddings_dimensions or None,
         api_key=settings.openai_api_key,
         http_client=_get_http_client(),
     )
+    store = get_embedding_store()
+    if store is None:
+        return embeddings
+    return CachedEmbeddings(embeddings, model=embedding_model_id(), store=store)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from . import db
+from .config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindPersister:
+    """Applies ticket writes on a background thread, in order, off the response path.
+
+    Every queued write is appended to a JSONL spool before it is acknowledged and
+    the spool is rewritten as writes land, so writes survive a restart or a
+    Supabase outage. Inserts are replayed as upserts on ticket_id and closes are
+    plain updates, so a write that landed just before a crash is safe to repeat.
+    Writes that keep failing past `max_attempts` move to `<spool>.failed`.
+    """
+
+    def __init__(self, spool_path: str, max_attempts: int = 20) -> None:
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+        self.written = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self._pending: list[dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._load_spool()
+
+    def insert_ticket(
+        self,
+        user_id: str,
+        ticket_title: str,
+        issue_description: str,
+        severity: str,
+        status: db.TicketStatus = "Open",
+    ) -> db.TicketRow:
+        """Queue an insert and return the row as it will be stored (ticket_id is client-generated)."""
+        payload = db.new_ticket_payload(user_id, ticket_title, issue_description, severity, status)
+        payload["created_at"] = datetime.utcnow().isoformat()
+        self._enqueue({"op": "insert", "ticket": payload})
+        return db.row_to_ticket(payload)
+
+    def close_ticket(self, ticket_id: str, solution: str, issue_description: str | None = None) -> None:
+        # resolved_at is stamped when the write lands, not when it is queued: a close that
+        # sat in the spool through an outage would otherwise land behind index watermarks.
+        op = {"op": "close", "ticket_id": ticket_id, "solution": solution}
+        if issue_description is not None:
+            op["issue_description"] = issue_description
+        self._enqueue(op)
+
+    def pending_for_user(self, user_id: str) -> list[db.TicketRow]:
+        """Tickets of `user_id` whose insert has not reached Supabase yet, newest first."""
+        with self._cond:
+            ops = list(self._pending)
+        rows: dict[str, dict[str, Any]] = {}
+        for op in ops:
+            if op["op"] == "insert" and op["ticket"]["user_id"] == user_id:
+                rows[op["ticket"]["ticket_id"]] = dict(op["ticket"])
+            elif op["op"] == "close" and op["ticket_id"] in rows:
+                rows[op["ticket_id"]].update(status="Closed", solution=op["solution"])
+                if op.get("issue_description") is not None:
+                    rows[op["ticket_id"]]["issue_description"] = op["issue_description"]
+        return [db.row_to_ticket(row) for row in reversed(rows.values())]
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued write has landed; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "written": self.written,
+                "retries": self.retries,
+                "dead_lettered": self.dead_lettered,
+            }
+
+    def _enqueue(self, op: dict[str, Any]) -> None:
+        op["attempts"] = 0
+        with self._cond:
+            self._pending.append(op)
+            self._append_spool(op)
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="ticket-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: bool(self._pending))
+                op = self._pending[0]
+                # New writes wake this thread up too; they must not cut a backoff short.
+                wait = op.get("next_attempt_at", 0.0) - time.time()
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue
+            try:
+                self._apply(op)
+            except Exception:
+                with self._cond:
+                    op["attempts"] += 1
+                    self.retries += 1
+                    if op["attempts"] >= self.max_attempts:
+                        logger.exception("Giving up on %s write after %d attempts", op["op"], op["attempts"])
+                        self._give_up(op)
+                        self._rewrite_spool()
+                        self._cond.notify_all()
+                        continue
+                    delay = min(60.0, 0.5 * 2 ** (op["attempts"] - 1))
+                    op["next_attempt_at"] = time.time() + delay
+                    self._rewrite_spool()
+                    logger.warning("Ticket %s write failed; retrying in %.1fs", op["op"], delay, exc_info=True)
+                continue
+            with self._cond:
+                self._pending.pop(0)
+                self.written += 1
+                self._rewrite_spool()
+                self._cond.notify_all()
+
+    def _give_up(self, op: dict[str, Any]) -> None:
+        """Dead-letter `op`; a failed insert takes the queued closes of its ticket with it."""
+        doomed = [op]
+        if op["op"] == "insert":
+            ticket_id = op["ticket"]["ticket_id"]
+            doomed += [o for o in self._pending if o["op"] == "close" and o["ticket_id"] == ticket_id]
+        self._pending = [o for o in self._pending if all(o is not d for d in doomed)]
+        for dead in doomed:
+            self.dead_lettered += 1
+            self._dead_letter(dead)
+
+    def _apply(self, op: dict[str, Any]) -> None:
+        if op["op"] == "insert":
+            db.upsert_ticket(op["ticket"])
+            return
+        ticket = db.update_ticket_solution(
+            ticket_id=op["ticket_id"],
+            solution=op["solution"],
+            status="Closed",
+            issue_description=op.get("issue_description"),
+        )
+        try:
+            from .similarity import get_ticket_index
+
+            get_ticket_index().add_closed_ticket(ticket)
+        except Exception:
+            # The next index sync picks the ticket up from the database anyway.
+            logger.exception("Failed to index closed ticket %s", ticket.ticket_id)
+
+    def _load_spool(self) -> None:
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._pending.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append; that write was never acknowledged.
+                    logger.warning("Skipping unreadable spool line in %s", self.spool_path)
+        if self._pending:
+            self._ensure_worker()
+
+    def _append_spool(self, op: dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(op) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_spool(self) -> None:
+        tmp = f"{self.spool_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for op in self._pending:
+                f.write(json.dumps(op) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spool_path)
+
+    def _dead_letter(self, op: dict[str, Any]) -> None:
+        with open(f"{self.spool_path}.failed", "a", encoding="utf-8") as f:
+            f.write(json.dumps(op) + "\n")
+
+
+_persister: WriteBehindPersister | None = None
+_persister_lock = threading.Lock()
+
+
+def get_persister() -> WriteBehindPersister:
+    global _persister
+    if _persister is None:
+        with _persister_lock:
+            if _persister is None:
+                _persister = WriteBehindPersister(
+                    settings.write_behind_spool_path,
+                    max_attempts=settings.write_behind_max_attempts,
+                )
+                # Give queued writes a moment to land; whatever is left stays in the spool.
+                atexit.register(_persister.flush, 5.0)
+    return _persister
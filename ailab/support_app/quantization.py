@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Literal
+
+import numpy as np
+
+
+VectorDtype = Literal["float32", "float16", "int8"]
+VECTOR_DTYPES: tuple[VectorDtype, ...] = ("float32", "float16", "int8")
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Return (codes, per-row scales). Scales are only used by int8."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float32":
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported vector dtype {dtype!r}; expected one of {VECTOR_DTYPES}")
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray | None) -> np.ndarray:
+    vectors = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        vectors = vectors * scales[:, None]
+    return vectors
+
+
+def dot(codes: np.ndarray, scales: np.ndarray | None, vector: np.ndarray) -> np.ndarray:
+    dots = codes @ vector
+    if scales is not None:
+        dots = dots * scales
+    return dots.astype(np.float32, copy=False)
+
+
+def squared_norms(codes: np.ndarray, scales: np.ndarray | None, chunk: int = 4096) -> np.ndarray:
+    norms = np.empty(len(codes), dtype=np.float32)
+    for i in range(0, len(codes), chunk):
+        rows = dequantize(codes[i : i + chunk], None if scales is None else scales[i : i + chunk])
+        norms[i : i + chunk] = np.einsum("ij,ij->i", rows, rows)
+    return norms
+
+
+def truncate_dims(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Shorten text-embedding-3 vectors the way the API's `dimensions` option does."""
+    shortened = np.asarray(vectors[:, :dims], dtype=np.float32)
+    lengths = np.linalg.norm(shortened, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1.0
+    return shortened / lengths
+
+
+def recall_at_k(
+    vectors: np.ndarray,
+    dims: int = 0,
+    dtype: str = "float32",
+    pq_m: int = 0,
+    k: int = 5,
+    sample: int = 200,
+    seed: int = 0,
+) -> float:
+    """Share of full-precision top-k neighbours that a compact setting still returns.
+
+    Corpus rows double as queries (their own row is excluded from both result sets).
+    """
+    full = np.asarray(vectors, dtype=np.float32)
+    n = len(full)
+    if n < 2:
+        return 1.0
+    k = min(k, n - 1)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(n, size=min(sample, n), replace=False)
+
+    truth = _top_k(full, squared_norms(full, None), full[picks], picks, k)
+
+    compact = truncate_dims(full, dims) if dims and dims < full.shape[1] else full
+    queries = compact[picks]
+    if pq_m:
+        import faiss
+
+        index = faiss.IndexPQ(compact.shape[1], pq_m, 8)
+        index.train(compact)
+        index.add(compact)
+        _, found = index.search(queries, k + 1)
+        got = np.array([[p for p in row if p != q][:k] for row, q in zip(found, picks)])
+    else:
+        codes, scales = quantize(compact, dtype)
+        approx = dequantize(codes, scales)
+        got = _top_k(approx, squared_norms(codes, scales), queries, picks, k)
+
+    overlap = [len(set(a) & set(b)) for a, b in zip(truth.tolist(), got.tolist())]
+    return float(np.mean(overlap) / k)
+
+
+def _top_k(
+    vectors: np.ndarray, norms: np.ndarray, queries: np.ndarray, exclude: np.ndarray, k: int
+) -> np.ndarray:
+    distances = norms[None, :] - 2.0 * (queries @ vectors.T)
+    distances[np.arange(len(queries)), exclude] = np.inf
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
@@ -0,0 +1,62 @@
+"""Compare compact vector settings against full-precision search on real tickets.
+
+    python -m support_app.recall_check --dims 0,1024,256 --dtype float32,float16,int8
+
+Reduced dimensions are simulated by truncating and re-normalizing the stored
+vectors, which is what the embeddings API's `dimensions` option does for
+text-embedding-3 models. Run it against a float32, full-dimension index.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+
+from .config import settings
+from .quantization import VECTOR_DTYPES, recall_at_k
+from .similarity import SharedTicketIndex
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure recall@k of compact vector settings.")
+    parser.add_argument("--dims", type=_int_list, default=[0], help="Comma-separated; 0 = full")
+    parser.add_argument("--dtype", default=",".join(VECTOR_DTYPES), help="Comma-separated dtypes")
+    parser.add_argument("--pq-m", type=_int_list, default=[], help="Comma-separated PQ sub-quantizer counts")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--dir", default=settings.similarity_snapshot_dir)
+    args = parser.parse_args(argv)
+
+    index = SharedTicketIndex(snapshot_dir=args.dir or None)
+    index.sync()
+    vectors = index._index.vectors()
+    if index._index.dtype != "float32":
+        print(f"warning: baseline index is {index._index.dtype}; recall is relative to that")
+    if not len(vectors):
+        print("No closed tickets indexed")
+        return 1
+
+    full_dim = vectors.shape[1]
+    print(f"{len(vectors)} vectors, {full_dim} dims, recall@{args.k} over {min(args.sample, len(vectors))} queries")
+    print(f"{'dims':>6} {'storage':>10} {'bytes/vec':>10} {'recall':>8}")
+    for dims in args.dims:
+        d = dims if dims and dims < full_dim else full_dim
+        for dtype in args.dtype.split(","):
+            bytes_per_vec = d * np.dtype(dtype).itemsize + (4 if dtype == "int8" else 0)
+            recall = recall_at_k(vectors, dims=d, dtype=dtype, k=args.k, sample=args.sample)
+            print(f"{d:>6} {dtype:>10} {bytes_per_vec:>10} {recall:>8.3f}")
+        for pq_m in args.pq_m:
+            if d % pq_m:
+                continue
+            recall = recall_at_k(vectors, dims=d, pq_m=pq_m, k=args.k, sample=args.sample)
+            print(f"{d:>6} {'pq' + str(pq_m):>10} {pq_m:>10} {recall:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
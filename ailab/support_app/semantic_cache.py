@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+
+class SemanticCache:
+    """In-memory cache keyed by embedding proximity instead of exact text.
+
+    A lookup returns the value stored for the nearest previous vector when it is
+    within `max_distance` (squared L2 on unit vectors, like the ticket index)
+    and younger than `ttl_s`. Entries are evicted least-recently-used.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, max_distance: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._vectors: np.ndarray | None = None
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._slots: OrderedDict[int, tuple[Any, float]] = OrderedDict()  # slot -> (value, stored_at)
+        self._free = list(range(max_entries - 1, -1, -1))
+
+    def get(self, vector: np.ndarray) -> Any | None:
+        query = _unit(vector)
+        with self._lock:
+            slot = self._nearest(query)
+            if slot is None:
+                self.misses += 1
+                return None
+            value, stored_at = self._slots[slot]
+            if time.monotonic() - stored_at > self.ttl_s:
+                self._drop(slot)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._slots.move_to_end(slot)
+            self.hits += 1
+            return value
+
+    def put(self, vector: np.ndarray, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        row = _unit(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(row):
+                self._reset(len(row))
+            if not self._free:
+                self._drop(next(iter(self._slots)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._vectors[slot] = row
+            self._live[slot] = True
+            self._slots[slot] = (value, time.monotonic())
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._slots),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+    def _nearest(self, query: np.ndarray) -> int | None:
+        if not self._slots or self._vectors is None or self._vectors.shape[1] != len(query):
+            return None
+        distances = 2.0 - 2.0 * (self._vectors @ query)
+        distances[~self._live] = np.inf
+        slot = int(np.argmin(distances))
+        return slot if distances[slot] <= self.max_distance else None
+
+    def _drop(self, slot: int) -> None:
+        del self._slots[slot]
+        self._live[slot] = False
+        self._free.append(slot)
+
+    def _reset(self, dim: int) -> None:
+        # A new embedding dimension invalidates everything cached so far.
+        self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._live[:] = False
+        self._slots.clear()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    row = np.asarray(vector, dtype=np.float32).ravel()
+    length = float(np.linalg.norm(row))
+    return row / length if length else row
@@ -1,61 +1,777 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import math
+import threading
+from datetime import datetime, timedelta
+from bisect import insort
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 
-from langchain_community.vectorstores import FAISS
+import numpy as np
 
-from .llm import get_embeddings
+from . import db
+from .agents import unwrap_reused_solution
+from .ann import AnnIndex, choose_index_type
+from .config import settings
+from .embedding_cache import normalize_text
+from .embedding_pipeline import embed_documents_bulk
+from .lexical import LexicalIndex, LexicalMatch
+from .llm import embedding_model_id, get_embeddings
+from .quantization import dequantize, dot, quantize, squared_norms
+from .snapshot import read_snapshot, write_snapshot
 from .types import SimilarityHit
 
 
 @dataclass
+class TicketEntry:
+    ticket_id: str
+    user_id: str
+    issue_description: str
+    solution: str
+    resolved_at: str | None = None
+    member_count: int = 1
+
+    def to_hit(self, score: float, match: str = "vector") -> SimilarityHit:
+        return {
+            "ticket_id": self.ticket_id,
+            "user_id": self.user_id,
+            "issue_description": self.issue_description,
+            "solution": self.solution,
+            "score": score,
+            "member_count": self.member_count,
+            "match": match,
+        }
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).casefold().encode("utf-8")).hexdigest()
+
+
+def embed_query(query: str) -> np.ndarray | None:
+    q = (query or "").strip()
+    if not q:
+        return None
+    return np.asarray(get_embeddings().embed_query(q), dtype=np.float32)
+
+
 class SimilarityIndex:
-    vectorstore: FAISS
+    """Closed tickets in one vector matrix, partitioned by `user_id`.
+
+    Scores are squared L2 distances, matching FAISS `IndexFlatL2`, so
+    `settings.similarity_threshold` keeps its meaning. Vectors are stored as
+    float32, float16 or per-row scaled int8 (`SIMILARITY_VECTOR_DTYPE`).
+
+    Near-duplicate tickets (same normalized solution, issue vectors within
+    `SIMILARITY_DEDUP_DISTANCE`) collapse into one representative row with a
+    member count. A row belongs to the partition of every member's user.
+
+    A BM25 index over the same rows backs `search_text`, which answers exact and
+    exact text matches without embedding the query.
+    """
+
+    def __init__(self, dtype: str | None = None) -> None:
+        self.dtype = dtype or settings.similarity_vector_dtype
+        self.entries: list[TicketEntry] = []
+        self.positions: dict[str, int] = {}
+        self.partitions: dict[str, list[int]] = {}
+        # Rows whose members all belong to one user; excluded from that user's "others" search.
+        self.exclusive: dict[str, list[int]] = {}
+        self._members: dict[int, list[tuple[str, str]]] = {}
+        self._cluster_keys: dict[str, int] = {}
+        self._by_solution: dict[str, list[int]] = {}
+        self.hit_counts: list[int] = []
+        self.lexical = LexicalIndex()
+        # Rows [0, len(_base)) come from `_base`, which may be a read-only memmap of a
+        # snapshot; rows added afterwards go to the growable `_vectors` buffer.
+        self._base = np.empty((0, 0), dtype=self.dtype)
+        self._base_scales: np.ndarray | None = None
+        self._base_norms = np.empty(0, dtype=np.float32)
+        self._vectors = np.empty((0, 0), dtype=self.dtype)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ann: AnnIndex | None = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def dim(self) -> int:
+        return self._base.shape[1] if len(self._base) else self._vectors.shape[1]
+
+    def codes(self, start: int = 0) -> tuple[np.ndarray, np.ndarray | None]:
+        """Stored rows from `start` on, as (codes, int8 scales or None)."""
+        base_n = len(self._base)
+        delta_rows = slice(max(0, start - base_n), len(self.entries) - base_n)
+        delta = self._vectors[delta_rows]
+        delta_scales = self._scales[delta_rows] if self.dtype == "int8" else None
+        if start >= base_n:
+            return delta, delta_scales
+        base_scales = None if self._base_scales is None else self._base_scales[start:]
+        if not len(delta):
+            return self._base[start:], base_scales
+        scales = None if delta_scales is None else np.concatenate([base_scales, delta_scales])
+        return np.concatenate([self._base[start:], delta]), scales
+
+    def vectors(self, start: int = 0) -> np.ndarray:
+        return dequantize(*self.codes(start))
+
+    def nbytes(self) -> int:
+        codes, scales = self.codes()
+        return int(codes.nbytes + (0 if scales is None else scales.nbytes))
+
+    def footprint(self) -> int:
+        """Approximate resident bytes: stored vectors, norms, ANN structure and ticket text."""
+        n = len(self.entries)
+        rows = n * (self.dim * np.dtype(self.dtype).itemsize + (8 if self.dtype == "int8" else 4))
+        text = sum(len(e.issue_description) + len(e.solution) for e in self.entries)
+        ann = self._ann.nbytes() if self._ann is not None else 0
+        return int(rows + text + ann)
+
+    def retain(self, positions: np.ndarray) -> "SimilarityIndex":
+        """Return a compacted copy holding only `positions` (heap-allocated)."""
+        keep = np.sort(np.asarray(positions, dtype=np.int64))
+        codes, scales = self.codes()
+        index = SimilarityIndex.from_arrays(
+            [replace(self.entries[p], member_count=1) for p in keep],
+            np.ascontiguousarray(codes[keep]),
+            None if scales is None else np.ascontiguousarray(scales[keep]),
+            [[list(m) for m in self.members(int(p))] for p in keep],
+            [self.lexical.member_keys.get(int(p), []) for p in keep],
+        )
+        index.hit_counts = [self.hit_counts[p] for p in keep]
+        return index
+
+    @classmethod
+    def from_arrays(
+        cls,
+        entries: list[TicketEntry],
+        vectors: np.ndarray,
+        scales: np.ndarray | None = None,
+        members: list[list[list[str]]] | None = None,
+        member_keys: list[list[str]] | None = None,
+    ) -> "SimilarityIndex":
+        if len(entries) != len(vectors):
+            raise ValueError(f"Got {len(entries)} entries for {len(vectors)} vectors")
+        index = cls(dtype=vectors.dtype.name)
+        index._base = vectors
+        index._base_scales = scales
+        index._base_norms = squared_norms(vectors, scales)
+        for position, entry in enumerate(entries):
+            index._register(entry, position)
+        for position, extra in enumerate(members or []):
+            for ticket_id, user_id in extra:
+                index._join(position, TicketEntry(ticket_id, user_id, "", ""))
+        for position, keys in enumerate(member_keys or []):
+            for key in keys:
+                index.lexical.add_member_key(position, key)
+        return index
+
+    def members(self, position: int) -> list[tuple[str, str]]:
+        """(ticket_id, user_id) of the tickets collapsed into a row, besides its own."""
+        return self._members.get(position, [])
 
     @classmethod
     def from_closed_tickets(cls, tickets: list[dict]) -> "SimilarityIndex":
-        texts: list[str] = []
-        metadatas: list[dict] = []
+        index = cls()
+        index.add_closed_tickets(tickets)
+        return index
+
+    def add_closed_tickets(self, tickets: list[dict]) -> int:
+        dedup = settings.similarity_dedup
+        fresh: list[TicketEntry] = []
+        fresh_keys: dict[str, int] = {}
+        joins: list[tuple[int, TicketEntry]] = []  # (index into `fresh`, duplicate)
+        seen: set[str] = set()
         for t in tickets:
+            ticket_id = str(t.get("ticket_id"))
             issue = (t.get("issue_description") or "").strip()
-            solution = (t.get("solution") or "").strip()
-            if not issue or not solution:
+            solution = unwrap_reused_solution((t.get("solution") or "").strip()).strip()
+            if not issue or not solution or ticket_id in self.positions or ticket_id in seen:
                 continue
-            texts.append(issue)
-            metadatas.append(
-                {
-                    "ticket_id": str(t.get("ticket_id")),
-                    "user_id": str(t.get("user_id")),
-                    "issue_description": issue,
-                    "solution": solution,
-                }
+            seen.add(ticket_id)
+            entry = TicketEntry(
+                ticket_id=ticket_id,
+                user_id=str(t.get("user_id")),
+                issue_description=issue,
+                solution=solution,
+                resolved_at=t.get("resolved_at"),
             )
+            key = self._cluster_key(entry)
+            if dedup and key in self._cluster_keys:
+                self._join(self._cluster_keys[key], entry)
+            elif dedup and key in fresh_keys:
+                joins.append((fresh_keys[key], entry))
+            else:
+                fresh_keys[key] = len(fresh)
+                fresh.append(entry)
 
-        embeddings = get_embeddings()
-        if not texts:
-            empty = FAISS.from_texts(["__empty__"], embeddings, metadatas=[{"empty": True}])
-            return cls(vectorstore=empty)
-        vs = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
-        return cls(vectorstore=vs)
+        if fresh:
+            vectors = embed_documents_bulk(get_embeddings(), [e.issue_description for e in fresh])
+            vectors = np.asarray(vectors, dtype=np.float32)
+            keep, into_row, into_fresh = list(range(len(fresh))), {}, {}
+            if dedup and settings.similarity_dedup_distance > 0:
+                keep, into_row, into_fresh = self._collapse_near_duplicates(fresh, vectors)
+            start = len(self.entries)
+            self._append([fresh[i] for i in keep], vectors[keep])
+            placed = {i: start + offset for offset, i in enumerate(keep)}
+            placed.update(into_row)
+            placed.update({i: placed[j] for i, j in into_fresh.items()})
+            for i in [*into_row, *into_fresh]:
+                self._join(placed[i], fresh[i])
+            for i, entry in joins:
+                self._join(placed[i], entry)
+        return len(seen)
+
+    def _collapse_near_duplicates(
+        self, fresh: list[TicketEntry], vectors: np.ndarray
+    ) -> tuple[list[int], dict[int, int], dict[int, int]]:
+        """Split fresh entries into new rows and near-duplicates.
+
+        Returns (fresh indexes to append, {fresh index: existing row position},
+        {fresh index: earlier kept fresh index}).
+        """
+        radius = settings.similarity_dedup_distance
+        keep: list[int] = []
+        into_row: dict[int, int] = {}
+        into_fresh: dict[int, int] = {}
+        kept_by_solution: dict[str, list[int]] = {}
+        for i, entry in enumerate(fresh):
+            solution_key = _text_key(entry.solution)
+            existing = self._by_solution.get(solution_key)
+            if existing:
+                candidates = np.asarray(existing, dtype=np.int64)
+                distances = self._distances(vectors[i], candidates)
+                best = int(np.argmin(distances))
+                if distances[best] <= radius:
+                    into_row[i] = int(candidates[best])
+                    continue
+            earlier = kept_by_solution.get(solution_key)
+            if earlier:
+                distances = np.sum((vectors[earlier] - vectors[i]) ** 2, axis=1)
+                best = int(np.argmin(distances))
+                if distances[best] <= radius:
+                    into_fresh[i] = earlier[best]
+                    continue
+            keep.append(i)
+            kept_by_solution.setdefault(solution_key, []).append(i)
+        return keep, into_row, into_fresh
 
     def search(self, query: str, k: int = 5) -> list[SimilarityHit]:
-        q = (query or "").strip()
-        if not q:
+        if not self.entries:
+            return []
+        if settings.similarity_hybrid:
+            return self.search_text(query, k=k)
+        vector = embed_query(query)
+        if vector is None:
+            return []
+        return self.search_by_vector(vector, k=k)
+
+    def search_by_vector(
+        self,
+        vector: np.ndarray,
+        k: int = 5,
+        user_id: str | None = None,
+        exclude_user: bool = False,
+        radius: float | None = None,
+    ) -> list[SimilarityHit]:
+        return self._hits(*self._vector_search(vector, k, user_id, exclude_user, radius))
+
+    def search_text(
+        self,
+        query: str,
+        k: int = 5,
+        user_id: str | None = None,
+        exclude_user: bool = False,
+        radius: float | None = None,
+    ) -> list[SimilarityHit]:
+        """Hybrid search: lexical shortcut, else vector search fused with lexical matches."""
+        if not self.entries:
             return []
-        docs_and_scores = self.vectorstore.similarity_search_with_score(q, k=k)
+        matches = self.lexical_search(query, k, user_id, exclude_user)
+        hits = self.lexical_hits(matches)
+        if hits:
+            return hits
+        vector = embed_query(query)
+        if vector is None:
+            return []
+        return self.fuse(vector, matches, k, user_id, exclude_user, radius)
+
+    def lexical_search(
+        self, query: str, k: int, user_id: str | None = None, exclude_user: bool = False
+    ) -> list[LexicalMatch]:
+        accept = None
+        if user_id is not None and exclude_user:
+            accept = lambda p: self._row_users(p) != {user_id}
+        elif user_id is not None:
+            accept = lambda p: user_id in self._row_users(p)
+        return self.lexical.search(query, k, accept)
+
+    def lexical_hits(self, matches: list[LexicalMatch]) -> list[SimilarityHit]:
+        """Hits for exact text matches, which skip the embedding (score 0.0).
+
+        Near-exact matches are not enough: one word such as "not" can flip the
+        issue, so they go through `fuse` with the query embedding instead.
+        """
         hits: list[SimilarityHit] = []
-        for doc, score in docs_and_scores:
-            md = doc.metadata or {}
-            if md.get("empty"):
-                continue
-            hits.append(
-                {
-                    "ticket_id": md.get("ticket_id", ""),
-                    "user_id": md.get("user_id", ""),
-                    "issue_description": md.get("issue_description", ""),
-                    "solution": md.get("solution", ""),
-                    "score": float(score),
-                }
-            )
-        hits.sort(key=lambda x: x["score"])
+        for position, confidence in matches:
+            if confidence >= 1.0:
+                self.hit_counts[position] += 1
+                hits.append(self.entries[position].to_hit(0.0, match="exact"))
+        return hits
+
+    def fuse(
+        self,
+        vector: np.ndarray,
+        matches: list[LexicalMatch],
+        k: int = 5,
+        user_id: str | None = None,
+        exclude_user: bool = False,
+        radius: float | None = None,
+    ) -> list[SimilarityHit]:
+        """Vector search, with lexical matches added as candidates and their distances discounted.
+
+        A row's fused score is its exact squared L2 distance scaled by
+        `1 - SIMILARITY_LEXICAL_WEIGHT * confidence`.
+        """
+        positions, distances = self._vector_search(vector, k, user_id, exclude_user, radius)
+        confidence = dict(matches)
+        scores = {int(p): float(d) for p, d in zip(positions, distances)}
+        missing = np.asarray(sorted(set(confidence) - set(scores)), dtype=np.int64)
+        if len(missing):
+            scores.update(zip(missing.tolist(), self._distances(vector, missing).tolist()))
+        weight = settings.similarity_lexical_weight
+        fused = {p: d * (1.0 - weight * confidence.get(p, 0.0)) for p, d in scores.items()}
+        ranked = sorted(
+            (p for p, d in fused.items() if radius is None or d <= radius), key=fused.__getitem__
+        )[:k]
+        hits: list[SimilarityHit] = []
+        for p in ranked:
+            self.hit_counts[p] += 1
+            match = "hybrid" if p in confidence else "vector"
+            hits.append(self.entries[p].to_hit(fused[p], match=match))
+        return hits
+
+    def _vector_search(
+        self,
+        vector: np.ndarray,
+        k: int,
+        user_id: str | None,
+        exclude_user: bool,
+        radius: float | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if not self.entries:
+            return empty
+        index_type = choose_index_type(len(self.entries))
+        # A user's own history is searched exactly while it is small: a filtered ANN
+        # search over a handful of rows in a large graph misses true neighbours.
+        own_small = (
+            user_id is not None
+            and not exclude_user
+            and len(self.partitions.get(user_id, ())) < settings.similarity_ann_min_size
+        )
+        if index_type != "flat" and not own_small:
+            return self._search_ann(index_type, vector, k, user_id, exclude_user, radius)
+
+        candidates = self._partition(user_id, exclude_user)
+        if candidates is not None and not len(candidates):
+            return empty
+        distances = self._distances(vector, candidates)
+        rows = np.arange(len(distances)) if radius is None else np.flatnonzero(distances <= radius)
+        if not len(rows):
+            return empty
+        k = min(k, len(rows))
+        top = rows[np.argpartition(distances[rows], k - 1)[:k]]
+        top = top[np.argsort(distances[top])]
+        positions = top if candidates is None else candidates[top]
+        return positions, distances[top]
+
+    def prepare(self) -> None:
+        """Build or extend the ANN structure ahead of the first search."""
+        index_type = choose_index_type(len(self.entries))
+        if index_type != "flat":
+            self._ann_index(index_type)
+
+    def _search_ann(
+        self,
+        index_type: str,
+        vector: np.ndarray,
+        k: int,
+        user_id: str | None,
+        exclude_user: bool,
+        radius: float | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        include = exclude = None
+        if user_id is not None and exclude_user:
+            exclude = np.asarray(self.exclusive.get(user_id, []), dtype=np.int64)
+        elif user_id is not None:
+            include = np.asarray(self.partitions.get(user_id, []), dtype=np.int64)
+            if not len(include):
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self._ann_index(index_type).search(
+            vector, k, radius=radius, include=include, exclude=exclude
+        )
+
+    def _hits(self, positions: np.ndarray, distances: np.ndarray) -> list[SimilarityHit]:
+        hits: list[SimilarityHit] = []
+        for p, d in zip(positions, distances):
+            self.hit_counts[int(p)] += 1
+            hits.append(self.entries[int(p)].to_hit(float(d)))
         return hits
+
+    def _ann_index(self, index_type: str) -> AnnIndex:
+        if self._ann is None or self._ann.index_type != index_type:
+            self._ann = AnnIndex.build(index_type, self.vectors())
+        elif self._ann.ntotal < len(self.entries):
+            self._ann.add(self.vectors(self._ann.ntotal))
+        return self._ann
+
+    def _row_users(self, position: int) -> set[str]:
+        return {self.entries[position].user_id, *(u for _, u in self._members.get(position, []))}
+
+    def _partition(self, user_id: str | None, exclude_user: bool) -> np.ndarray | None:
+        if user_id is None:
+            return None
+        if not exclude_user:
+            return np.asarray(self.partitions.get(user_id, []), dtype=np.int64)
+        mask = np.ones(len(self.entries), dtype=bool)
+        mask[np.asarray(self.exclusive.get(user_id, []), dtype=np.int64)] = False
+        return np.flatnonzero(mask)
+
+    def _distances(self, vector: np.ndarray, candidates: np.ndarray | None) -> np.ndarray:
+        base_n = len(self._base)
+        delta_n = len(self.entries) - base_n
+        if candidates is None:
+            base_rows, delta_rows = slice(None), slice(0, delta_n)
+        else:
+            split = int(np.searchsorted(candidates, base_n))
+            base_rows, delta_rows = candidates[:split], candidates[split:] - base_n
+
+        parts: list[np.ndarray] = []
+        if base_n:
+            base_scales = None if self._base_scales is None else self._base_scales[base_rows]
+            parts.append(
+                _l2(self._base[base_rows], base_scales, self._base_norms[base_rows], vector)
+            )
+        if delta_n:
+            delta_scales = self._scales[delta_rows] if self.dtype == "int8" else None
+            parts.append(
+                _l2(self._vectors[delta_rows], delta_scales, self._norms[delta_rows], vector)
+            )
+        return np.concatenate(parts)
+
+    def _append(self, entries: list[TicketEntry], vectors: np.ndarray) -> None:
+        if self.entries and self.dim != vectors.shape[1]:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {vectors.shape[1]}")
+        n = len(self.entries)
+        delta_n = n - len(self._base)
+        needed = delta_n + len(entries)
+        if self._vectors.shape[0] < needed or self._vectors.shape[1] != vectors.shape[1]:
+            capacity = max(needed, 2 * self._vectors.shape[0], 64)
+            grown = np.empty((capacity, vectors.shape[1]), dtype=self.dtype)
+            scales = np.ones(capacity, dtype=np.float32)
+            norms = np.empty(capacity, dtype=np.float32)
+            if delta_n:
+                grown[:delta_n] = self._vectors[:delta_n]
+                scales[:delta_n] = self._scales[:delta_n]
+                norms[:delta_n] = self._norms[:delta_n]
+            self._vectors, self._scales, self._norms = grown, scales, norms
+
+        codes, scales = quantize(vectors, self.dtype)
+        self._vectors[delta_n:needed] = codes
+        if scales is not None:
+            self._scales[delta_n:needed] = scales
+        self._norms[delta_n:needed] = squared_norms(codes, scales)
+        for offset, entry in enumerate(entries):
+            self._register(entry, n + offset)
+
+    def _register(self, entry: TicketEntry, position: int) -> None:
+        self.entries.append(entry)
+        self.hit_counts.append(0)
+        self.lexical.add(position, entry.issue_description)
+        self.positions[entry.ticket_id] = position
+        self.partitions.setdefault(entry.user_id, []).append(position)
+        self.exclusive.setdefault(entry.user_id, []).append(position)
+        self._cluster_keys.setdefault(self._cluster_key(entry), position)
+        self._by_solution.setdefault(_text_key(entry.solution), []).append(position)
+
+    def _join(self, position: int, entry: TicketEntry) -> None:
+        rep = self.entries[position]
+        users = {rep.user_id, *(u for _, u in self._members.get(position, []))}
+        rep.member_count += 1
+        if entry.resolved_at and (rep.resolved_at is None or entry.resolved_at > rep.resolved_at):
+            rep.resolved_at = entry.resolved_at
+        self.positions[entry.ticket_id] = position
+        self._members.setdefault(position, []).append((entry.ticket_id, entry.user_id))
+        self.lexical.add_member(position, entry.issue_description)
+        if entry.user_id not in users:
+            insort(self.partitions.setdefault(entry.user_id, []), position)
+            if len(users) == 1:
+                self.exclusive[rep.user_id].remove(position)
+
+    @staticmethod
+    def _cluster_key(entry: TicketEntry) -> str:
+        return _text_key(entry.issue_description + "\x00" + entry.solution)
+
+
+def _l2(
+    codes: np.ndarray, scales: np.ndarray | None, norms: np.ndarray, vector: np.ndarray
+) -> np.ndarray:
+    distances = norms - 2.0 * dot(codes, scales, vector) + float(vector @ vector)
+    return np.maximum(distances, 0.0)
+
+
+class SharedTicketIndex:
+    """Process-wide index over closed tickets, synced incrementally.
+
+    The watermark is the (resolved_at, ticket_id) keyset cursor of the last ticket seen.
+    Each sync re-reads from `SIMILARITY_SYNC_OVERLAP_S` before it: `resolved_at` comes
+    from the writer's clock and can land behind a watermark another process already
+    passed. Tickets already indexed are skipped before embedding, so the overlap is cheap.
+    """
+
+    def __init__(self, page_size: int = 500, snapshot_dir: str | None = None) -> None:
+        self.page_size = page_size
+        self.snapshot_dir = snapshot_dir
+        self.watermark: tuple[str, str] | None = None
+        self.max_bytes = int(settings.similarity_index_max_mb * 1024 * 1024)
+        self.evictions = 0
+        self.lexical_answered = 0
+        self.embedded_queries = 0
+        self._index = SimilarityIndex()
+        self._lock = threading.RLock()
+        self._snapshot_checked = False
+        self._pinned: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def sync(self) -> int:
+        added = 0
+        with self._lock:
+            if not self._snapshot_checked:
+                self._snapshot_checked = True
+                self.load_snapshot()
+            since = _rewind(self.watermark, settings.similarity_sync_overlap_s)
+            after = None if since is not None else self.watermark
+            for page in db.iter_closed_ticket_pages(after, page_size=self.page_size, since=since):
+                added += self._index.add_closed_tickets([t.__dict__ for t in page])
+                last = page[-1]
+                self.watermark = max(self.watermark or ("", ""), (last.resolved_at or "", last.ticket_id))
+                self._enforce_budget()
+            self._index.prepare()
+        return added
+
+    def load_snapshot(self, directory: str | None = None) -> bool:
+        directory = directory or self.snapshot_dir
+        if not directory:
+            return False
+        snapshot = read_snapshot(directory)
+        if snapshot is None:
+            return False
+        arrays, columns, manifest = snapshot
+        if manifest.get("model") != embedding_model_id():
+            return False
+        if manifest.get("dtype") != settings.similarity_vector_dtype:
+            return False
+        entries = [
+            TicketEntry(*row)
+            for row in zip(
+                columns["ticket_id"],
+                columns["user_id"],
+                columns["issue_description"],
+                columns["solution"],
+                columns["resolved_at"],
+            )
+        ]
+        with self._lock:
+            self._index = SimilarityIndex.from_arrays(
+                entries,
+                arrays["vectors"],
+                arrays.get("scales"),
+                columns.get("members"),
+                columns.get("member_keys"),
+            )
+            watermark = manifest.get("watermark")
+            self.watermark = tuple(watermark) if isinstance(watermark, list) else None
+        return True
+
+    def save_snapshot(self, directory: str | None = None) -> str:
+        directory = directory or self.snapshot_dir
+        if not directory:
+            raise RuntimeError("No snapshot directory configured (SIMILARITY_SNAPSHOT_DIR)")
+        with self._lock:
+            entries = self._index.entries
+            columns = {
+                "ticket_id": [e.ticket_id for e in entries],
+                "user_id": [e.user_id for e in entries],
+                "issue_description": [e.issue_description for e in entries],
+                "solution": [e.solution for e in entries],
+                "resolved_at": [e.resolved_at for e in entries],
+                "members": [
+                    [list(m) for m in self._index.members(p)] for p in range(len(entries))
+                ],
+                "member_keys": [
+                    self._index.lexical.member_keys.get(p, []) for p in range(len(entries))
+                ],
+            }
+            codes, scales = self._index.codes()
+            arrays = {"vectors": codes}
+            if scales is not None:
+                arrays["scales"] = scales
+            return write_snapshot(
+                directory,
+                arrays,
+                columns,
+                {
+                    "model": embedding_model_id(),
+                    "dtype": self._index.dtype,
+                    "watermark": list(self.watermark) if self.watermark else None,
+                },
+            )
+
+    def add_closed_ticket(self, ticket: db.TicketRow) -> bool:
+        if ticket.status != "Closed":
+            return False
+        with self._lock:
+            added = self._index.add_closed_tickets([ticket.__dict__]) > 0
+            self._enforce_budget()
+            return added
+
+    def pin_user(self, user_id: str) -> None:
+        """Keep a recently active user's partition out of eviction (bounded LRU)."""
+        if settings.similarity_pinned_users <= 0:
+            return
+        with self._lock:
+            self._pinned[user_id] = None
+            self._pinned.move_to_end(user_id)
+            while len(self._pinned) > settings.similarity_pinned_users:
+                self._pinned.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "rows": len(self._index),
+                "tickets": len(self._index.positions),
+                "footprint_bytes": self._index.footprint(),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "pinned_users": len(self._pinned),
+                "lexical_answered": self.lexical_answered,
+                "embedded_queries": self.embedded_queries,
+            }
+
+    def _enforce_budget(self) -> None:
+        """Evict rarely-hit, then oldest rows until the index is back under 90% of budget."""
+        index = self._index
+        footprint = index.footprint()
+        if not self.max_bytes or footprint <= self.max_bytes or not len(index):
+            return
+        pinned: set[int] = set()
+        for user_id in self._pinned:
+            pinned.update(index.partitions.get(user_id, []))
+        candidates = [p for p in range(len(index)) if p not in pinned]
+        candidates.sort(
+            key=lambda p: (
+                int(math.log2(1 + index.hit_counts[p])),
+                index.entries[p].resolved_at or "",
+            )
+        )
+        per_row = footprint / len(index)
+        count = min(len(candidates), math.ceil((footprint - 0.9 * self.max_bytes) / per_row))
+        if count <= 0:
+            return
+        doomed = set(candidates[:count])
+        self._index = index.retain(np.asarray([p for p in range(len(index)) if p not in doomed]))
+        self.evictions += count
+
+    def search_partitioned(
+        self, user_id: str, query: str, k: int = 5, radius: float | None = None
+    ) -> tuple[list[SimilarityHit], list[SimilarityHit]]:
+        """Return (own history hits, other users' hits) using a single query embedding.
+
+        With `radius`, both lookups are range searches and the other-users lookup
+        is skipped once the user's own history already has a hit.
+        """
+        if not len(self._index):
+            return [], []
+        if settings.similarity_hybrid:
+            return self._search_partitioned_hybrid(user_id, query, k, radius)
+        vector = embed_query(query)
+        if vector is None:
+            return [], []
+        self.embedded_queries += 1
+        self.pin_user(user_id)
+        with self._lock:
+            user_hits = self._index.search_by_vector(vector, k=k, user_id=user_id, radius=radius)
+            if radius is not None and user_hits:
+                return user_hits, []
+            other_hits = self._index.search_by_vector(
+                vector, k=k, user_id=user_id, exclude_user=True, radius=radius
+            )
+        return user_hits, other_hits
+
+    def _search_partitioned_hybrid(
+        self, user_id: str, query: str, k: int, radius: float | None
+    ) -> tuple[list[SimilarityHit], list[SimilarityHit]]:
+        """Lexical first; embed the query only when neither partition has an exact match.
+
+        An exact match in other users' tickets only short-circuits when the
+        user's own history has no lexical candidate at all, so a weaker own-history
+        match still gets its vector check first; it is used after that check fails.
+        """
+        self.pin_user(user_id)
+        with self._lock:
+            index = self._index
+            user_matches = index.lexical_search(query, k, user_id=user_id)
+            user_hits = index.lexical_hits(user_matches)
+            if user_hits:
+                self.lexical_answered += 1
+                return user_hits, []
+            other_matches = index.lexical_search(query, k, user_id=user_id, exclude_user=True)
+            if not user_matches:
+                other_hits = index.lexical_hits(other_matches)
+                if other_hits:
+                    self.lexical_answered += 1
+                    return [], other_hits
+
+        vector = embed_query(query)
+        if vector is None:
+            return [], []
+        self.embedded_queries += 1
+        # `index` may have been replaced by an eviction meanwhile; its row positions stay valid.
+        with self._lock:
+            user_hits = index.fuse(vector, user_matches, k, user_id=user_id, radius=radius)
+            if radius is not None and user_hits:
+                return user_hits, []
+            other_hits = index.lexical_hits(other_matches) or index.fuse(
+                vector, other_matches, k, user_id=user_id, exclude_user=True, radius=radius
+            )
+        return user_hits, other_hits
+
+
+def _rewind(watermark: tuple[str, str] | None, seconds: float) -> str | None:
+    """The resolved_at to re-read from, or None to continue strictly after the watermark."""
+    if watermark is None or seconds <= 0:
+        return None
+    try:
+        resolved_at = datetime.fromisoformat(watermark[0])
+    except ValueError:
+        return None
+    return (resolved_at - timedelta(seconds=seconds)).isoformat()
+
+
+_shared_index: SharedTicketIndex | None = None
+_shared_index_lock = threading.Lock()
+
+
+def get_ticket_index() -> SharedTicketIndex:
+    global _shared_index
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                _shared_index = SharedTicketIndex(
+                    snapshot_dir=settings.similarity_snapshot_dir or None
+                )
+    return _shared_index
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any
+from uuid import uuid4
+
+import numpy as np
+
+
+SNAPSHOT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+
+
+def write_snapshot(
+    directory: str,
+    arrays: dict[str, np.ndarray],
+    columns: dict[str, list[Any]],
+    info: dict[str, Any],
+) -> str:
+    """Write each array as one contiguous `.npy` file plus a columnar metadata table.
+
+    `arrays` must contain "vectors"; extra arrays (e.g. int8 "scales") are row-aligned.
+    Files are generation-stamped and the manifest is swapped in last, so readers
+    never see a vectors file paired with the wrong metadata.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous = _read_manifest(directory)
+
+    generation = time.strftime("%Y%m%dT%H%M%S") + f"-{uuid4().hex[:8]}"
+    files: dict[str, str] = {}
+    for name, array in arrays.items():
+        files[name] = f"{name}-{generation}.npy"
+        np.save(os.path.join(directory, files[name]), np.ascontiguousarray(array))
+    meta_name = f"meta-{generation}.json"
+    _write_json(os.path.join(directory, meta_name), columns)
+
+    vectors = arrays["vectors"]
+    manifest = {
+        **info,
+        "version": SNAPSHOT_VERSION,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "arrays": files,
+        "meta": meta_name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    _write_json(os.path.join(directory, MANIFEST_NAME), manifest)
+
+    # Processes that already mapped the old generation keep their pages until they exit.
+    if previous:
+        stale = list((previous.get("arrays") or {}).values()) + [previous.get("meta")]
+        for name in stale:
+            if name and name != meta_name and name not in files.values():
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+    return os.path.join(directory, MANIFEST_NAME)
+
+
+def read_snapshot(
+    directory: str,
+) -> tuple[dict[str, np.ndarray], dict[str, list[Any]], dict[str, Any]] | None:
+    """Return (arrays, columns, manifest), with arrays memory-mapped read-only.
+
+    Returns None when there is no usable snapshot. A concurrent `write_snapshot`
+    can remove the generation a manifest points at between the two reads, so a
+    failed load re-reads the manifest and tries the new generation once.
+    """
+    for _ in range(2):
+        manifest = _read_manifest(directory)
+        if not manifest or manifest.get("version") != SNAPSHOT_VERSION:
+            return None
+        try:
+            arrays = {
+                name: np.load(os.path.join(directory, filename), mmap_mode="r")
+                for name, filename in manifest["arrays"].items()
+            }
+            with open(os.path.join(directory, manifest["meta"]), encoding="utf-8") as f:
+                columns = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if any(len(array) != manifest.get("count") for array in arrays.values()):
+            continue
+        return arrays, columns, manifest
+    return None
+
+
+def _read_manifest(directory: str) -> dict[str, Any] | None:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, payload: Any) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp, path)
@@ -0,0 +1,198 @@
+"""Rule-based fast path ahead of the conversation LLM.
+
+Clear-cut messages are decided locally: obvious login failures become a ticket
+draft and small talk gets a canned reply. Everything else goes to the LLM.
+Check the split on real traffic with:
+
+    python -m support_app.triage messages.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import re
+import sys
+import threading
+from dataclasses import dataclass
+
+from .config import settings
+from .types import Severity, TicketDraft
+
+
+# (name, pattern, weight): the scoring model is a logistic over matched features.
+_FEATURES: list[tuple[str, re.Pattern[str], float]] = [
+    (name, re.compile(pattern, re.IGNORECASE), weight)
+    for name, pattern, weight in [
+        ("locked", r"\block(?:ed)?\s*out\b|\baccount (?:is |got |was )?(?:locked|disabled|suspended|blocked)\b", 5.5),
+        ("otp", r"\botp\b|one[- ]time (?:code|password|pin)|verification code|\bsms code\b", 3.5),
+        ("2fa", r"\b2fa\b|\bmfa\b|two[- ](?:factor|step)|multi[- ]factor|authenticator app", 3.5),
+        ("sso", r"\bsso\b|single sign[- ]on|\bsaml\b|\bokta\b|azure ad|\boauth\b", 3.5),
+        ("password", r"\bpass(?:word|code|phrase)s?\b|\bpwd\b|\bcredentials?\b", 3.0),
+        ("login", r"\blog(?:ging)?[- ]?(?:in|on)\b|\bsign(?:ing)?[- ]?(?:in|on)\b|\bauthenticat\w*", 3.0),
+        (
+            "failure",
+            r"\bcan'?t\b|\bcannot\b|\bunable\b|\bnot (?:work|accept|receiv|com|arriv|load)\w*|\bfail\w*|"
+            r"\berror\b|\binvalid\b|\bincorrect\b|\bwrong\b|\bdenied\b|\bexpired?\b|\bstuck\b|\bloop\w*\b",
+            2.0,
+        ),
+        ("how_to", r"^\s*(?:how (?:do|can|to)|what(?:'s| is)|where (?:do|can|is)|can i|is it possible)\b", -2.0),
+    ]
+]
+_BIAS = -2.5
+
+# (pattern, reply): small talk can come mid-conversation, e.g. "thanks" after a solution.
+_SMALL_TALK: list[tuple[re.Pattern[str], str]] = [
+    (
+        re.compile(
+            rf"^\s*(?:{words})(?:\s+(?:there|again|a lot|so much))?[\s!.?]*$", re.IGNORECASE
+        ),
+        reply,
+    )
+    for words, reply in [
+        (
+            r"hi|hello|hey|good (?:morning|afternoon|evening)",
+            "Hi! Describe the login or sign-in problem you're seeing and I'll take it from there.",
+        ),
+        (
+            r"thanks|thank you|thx",
+            "You're welcome! If anything else comes up with signing in, just describe it here.",
+        ),
+        (
+            r"ok(?:ay)?|cool|great",
+            "Sounds good. If a sign-in problem comes up or comes back, just describe what you're seeing.",
+        ),
+        (r"bye|goodbye", "Bye! Come back any time you have trouble signing in."),
+    ]
+]
+
+# Same guidance the conversation prompt gives the LLM, checked from most to least severe.
+_SEVERITY_RULES: list[tuple[Severity, re.Pattern[str]]] = [
+    # "production outage or no user can login": an outage, or every user failing to sign in.
+    (
+        "Critical",
+        re.compile(
+            r"\boutage\b|\b(?:production|prod|site|app|login|sso)\s+(?:is\s+|went\s+)?down\b|"
+            r"\b(?:everyone|every user|all (?:users|employees|staff|of us)|whole (?:team|company|office)|"
+            r"entire (?:team|company|office))\b.{0,40}?\b(?:can'?t|cannot|unable|locked|blocked|fail\w*)\b|"
+            r"\b(?:nobody|no one|no-one|no user)\s+(?:\w+\s+)?(?:can|is able to|could)\s+"
+            r"(?:log|sign|get)\b",
+            re.IGNORECASE,
+        ),
+    ),
+    ("High", re.compile(_FEATURES[0][1].pattern + "|" + _FEATURES[2][1].pattern, re.IGNORECASE)),
+    (
+        "Medium",
+        re.compile(
+            _FEATURES[1][1].pattern + r"|\b(?:always|every time|keeps?|repeatedly|frequent\w*|again and again)\b",
+            re.IGNORECASE,
+        ),
+    ),
+    ("Low", re.compile(r"\b(?:intermittent\w*|sometimes|occasionally|cache|cookies?|browser|session)\b", re.IGNORECASE)),
+]
+
+_TITLES = {
+    "locked": "Account locked out",
+    "otp": "Verification code not received",
+    "2fa": "Two-factor authentication failure",
+    "sso": "SSO sign-in failure",
+    "password": "Password not accepted",
+    "login": "Unable to log in",
+}
+
+
+@dataclass(frozen=True)
+class TriageResult:
+    needs_ticket: bool
+    confidence: float
+    message: str
+    ticket: TicketDraft | None = None
+
+
+_stats = {"rules_ticket": 0, "rules_chat": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+
+def score(message: str) -> tuple[float, list[str]]:
+    """Probability that `message` reports a login problem, and the features that fired."""
+    matched = [name for name, pattern, _ in _FEATURES if pattern.search(message)]
+    logit = _BIAS + sum(weight for name, _, weight in _FEATURES if name in matched)
+    return 1.0 / (1.0 + math.exp(-logit)), matched
+
+
+def severity_for(message: str) -> Severity:
+    for severity, pattern in _SEVERITY_RULES:
+        if pattern.search(message):
+            return severity
+    return "Medium"
+
+
+def classify(message: str) -> TriageResult | None:
+    """Decide locally when the rules are confident; None means ask the LLM."""
+    text = (message or "").strip()
+    result: TriageResult | None = None
+    reply = next((reply for pattern, reply in _SMALL_TALK if pattern.match(text)), None)
+    if reply is not None:
+        result = TriageResult(needs_ticket=False, confidence=1.0, message=reply)
+    elif text:
+        probability, matched = score(text)
+        title = next((_TITLES[name] for name in _TITLES if name in matched), None)
+        # A failure word alone ("it fails with error 500") isn't a login problem yet.
+        if title is not None and probability >= settings.triage_min_confidence:
+            severity = severity_for(text)
+            result = TriageResult(
+                needs_ticket=True,
+                confidence=probability,
+                # The graph then reports whether a ticket was opened or an open one reused.
+                message=(
+                    f"Sorry you're having trouble signing in. This looks like a {severity.lower()}-severity "
+                    "issue; I'm checking resolved tickets for a fix."
+                ),
+                ticket={"ticket_title": title, "issue_description": text, "severity": severity},
+            )
+
+    with _stats_lock:
+        if result is None:
+            _stats["llm"] += 1
+        else:
+            _stats["rules_ticket" if result.needs_ticket else "rules_chat"] += 1
+    return result
+
+
+def triage_stats() -> dict[str, float]:
+    with _stats_lock:
+        total = sum(_stats.values())
+        return {**_stats, "llm_calls_saved": (total - _stats["llm"]) / total if total else 0.0}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Show how messages split between rules and the LLM.")
+    parser.add_argument("path", nargs="?", help="One message per line (default: stdin)")
+    parser.add_argument("--show", action="store_true", help="Print each decision")
+    args = parser.parse_args(argv)
+
+    stream = open(args.path, encoding="utf-8") if args.path else sys.stdin
+    with stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            result = classify(line)
+            if args.show:
+                if result is None:
+                    decision = "llm"
+                elif result.ticket is not None:
+                    decision = f"ticket/{result.ticket['severity']}"
+                else:
+                    decision = "chat"
+                print(f"{decision:<16} {line.strip()}")
+    stats = triage_stats()
+    total = stats["rules_ticket"] + stats["rules_chat"] + stats["llm"]
+    print(
+        f"{total} messages: {stats['rules_ticket']} ticket by rules, {stats['rules_chat']} chat by rules, "
+        f"{stats['llm']} to the LLM ({stats['llm_calls_saved']:.0%} of LLM calls saved)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Literal, TypedDict
+from typing import Literal
+
+from typing_extensions import NotRequired, TypedDict
 
 
 Severity = Literal["Low", "Medium", "High", "Critical"]
@@ -18,3 +20,12 @@ class SimilarityHit(TypedDict):
     issue_description: str
     solution: str
     score: float
+    member_count: int
+    match: NotRequired[Literal["vector", "exact", "hybrid"]]
+
+
+class SimilarityRef(TypedDict):
+    """What graph state keeps of a similarity hit; the chosen hit's text is copied into the answer."""
+
+    ticket_id: str
+    score: float
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+_warmup_thread: threading.Thread | None = None
+_warmup_lock = threading.Lock()
+
+
+def start_background_warmup() -> threading.Thread:
+    """Import the LLM/graph stack and load the ticket index off the request path.
+
+    Safe to call on every Streamlit rerun; only the first call starts a thread.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warm_up, name="support-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def _warm_up() -> None:
+    from .graph import get_graph
+    from .similarity import get_ticket_index
+
+    get_graph()
+    try:
+        get_ticket_index().sync()
+    except Exception:
+        logger.exception("Ticket index warm-up failed; it will load on the first request")
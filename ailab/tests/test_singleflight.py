@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from support_app.llm import Singleflight
+
+
+async def _slow(result, runs, delay=0.1):
+    runs.append(1)
+    await asyncio.sleep(delay)
+    return result
+
+
+def test_leader_cancelled_follower_gets_result():
+    async def main():
+        sf, runs = Singleflight(), []
+        leader = asyncio.create_task(sf.ado("k", lambda: _slow(42, runs)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(sf.ado("k", lambda: _slow(0, runs)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == (42, True)
+        assert leader.cancelled()
+        assert len(runs) == 1
+        assert sf.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_abandoned_call_is_cancelled_and_key_released():
+    async def main():
+        sf, runs = Singleflight(), []
+        leader = asyncio.create_task(sf.ado("k", lambda: _slow(1, runs)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert sf.stats()["in_flight"] == 0
+        assert await sf.ado("k", lambda: _slow(2, runs)) == (2, False)
+
+    asyncio.run(main())
+
+
+def test_follower_cancelled_does_not_break_key():
+    async def main():
+        sf, runs = Singleflight(), []
+        leader = asyncio.create_task(sf.ado("k", lambda: _slow(42, runs)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(sf.ado("k", lambda: _slow(0, runs)))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        assert await leader == (42, False)
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert sf.stats()["in_flight"] == 0
+        assert await sf.ado("k", lambda: _slow(7, runs)) == (7, False)
+        assert sf.do("k", lambda: 8) == (8, False)
+
+    asyncio.run(main())
+
+
+def test_sync_and_async_callers_share_one_call():
+    sf, calls = Singleflight(), []
+    started = threading.Event()
+
+    def blocking():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "sync"
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(sf.do("k", blocking)))
+    thread.start()
+    started.wait()
+
+    async def follower():
+        return await sf.ado("k", lambda: _slow("async", calls))
+
+    assert asyncio.run(follower()) == ("sync", True)
+    thread.join()
+    assert results == [("sync", False)]
+    assert len(calls) == 1
+    assert sf.stats() == {"calls": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_sync_follower_of_cancelled_async_leader():
+    sf, runs = Singleflight(), []
+    results = []
+
+    async def main():
+        leader = asyncio.create_task(sf.ado("k", lambda: _slow(5, runs, delay=0.2)))
+        await asyncio.sleep(0.01)
+        thread = threading.Thread(target=lambda: results.append(sf.do("k", lambda: 0)))
+        thread.start()
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        await asyncio.sleep(0.3)
+        thread.join()
+
+    asyncio.run(main())
+    assert results == [(5, True)]
+    assert sf.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter():
+    async def main():
+        sf = Singleflight()
+
+        async def boom():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        outcomes = await asyncio.gather(*[sf.ado("k", boom) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(o, ValueError) for o in outcomes)
+        assert sf.stats()["in_flight"] == 0
+
+    asyncio.run(main())